@@ -2,41 +2,68 @@
 
 #load system libraries
 from SimpleCV.base import *
-from SimpleCV.ImageClass import Image, ImageSet, ColorSpace
+from SimpleCV.ImageClass import Image, ImageSet, ColorSpace, FramePool
 from SimpleCV.Display import Display
 from SimpleCV.Color import Color
 from collections import deque
+from Queue import Empty
 import time
 import ctypes as ct
 import subprocess
+import hashlib
 import cv2
 import numpy as np
 
 #Globals
 _cameras = []
-_camera_polling_thread = ""
 _index = []
 
 class FrameBufferThread(threading.Thread):
     """
     **SUMMARY**
 
-    This is a helper thread which continually debuffers the camera frames.  If
-    you don't do this, cameras may constantly give you a frame behind, which
-    causes problems at low sample rates.  This makes sure the frames returned
-    by your camera are fresh.
+    This is a helper thread which continually debuffers the frames of one
+    camera.  If you don't do this, cameras may constantly give you a frame
+    behind, which causes problems at low sample rates.  This makes sure the
+    frames returned by your camera are fresh.
+
+    Every threaded camera gets its own thread, which grabs frames as fast as
+    the device delivers them and appends them, with their capture time, to the
+    camera's ring buffer of the last few frames.
 
     """
+    camera = None
+
+    def __init__(self, camera):
+        super(FrameBufferThread, self).__init__()
+        self._stop = threading.Event()
+        self.camera = camera
+        self.name = 'Thread-Camera-ID-' + str(camera.index)
+
     def run(self):
-        global _cameras
-        while (1):
-            for cam in _cameras:
-                if cam.pygame_camera:
-                    cam.pygame_buffer = cam.capture.get_image(cam.pygame_buffer)
-                else:
-                    cv.GrabFrame(cam.capture)
-                cam._threadcapturetime = time.time()
-            time.sleep(0.04)    #max 25 fps, if you're lucky
+        cam = self.camera
+        while not self._stop.isSet():
+            if cam.pygame_camera:
+                cam.pygame_buffer = cam.capture.get_image(cam.pygame_buffer)
+                capturetime = time.time()
+                img = Image(cam.pygame_buffer.copy(), cam)
+            else:
+                if not cv.GrabFrame(cam.capture):
+                    time.sleep(0.01) #no frame, don't spin on a dead device
+                    continue
+                capturetime = time.time()
+                img = cam._wrapFrame(cv.RetrieveFrame(cam.capture))
+            img.capturetime = capturetime
+            #deque appends are atomic, readers never wait on the capture thread
+            cam._buffer.append((capturetime, img))
+            cam._threadcapturetime = capturetime
+            cam._frameReady.set()
+
+    def stop(self):
+        self._stop.set()
+
+    def stopped(self):
+        return self._stop.isSet()
 
 
 
@@ -402,6 +429,10 @@ class Camera(FrameSource):
     thread = ""
     pygame_camera = False
     pygame_buffer = ""
+    _buffer = None #ring buffer of (capturetime, Image) filled by the FrameBufferThread
+    _frameReady = None #set once the first frame is in the ring buffer
+    framepool = None #FramePool the frames are copied into, if any
+    frametimeout = 10.0 #seconds a threaded getImage() waits for the first frame
 
 
     prop_map = {"width": cv.CV_CAP_PROP_FRAME_WIDTH,
@@ -414,9 +445,8 @@ class Camera(FrameSource):
         "exposure": cv.CV_CAP_PROP_EXPOSURE}
     #human readable to CV constant property mapping
 
-    def __init__(self, camera_index = -1, prop_set = {}, threaded = True, calibrationfile = ''):
+    def __init__(self, camera_index = -1, prop_set = {}, threaded = True, calibrationfile = '', buffersize = 4, framepool = None):
         global _cameras
-        global _camera_polling_thread
         global _index
         """
         **SUMMARY**
@@ -426,9 +456,10 @@ class Camera(FrameSource):
         Supported props are currently: height, width, brightness, contrast,
         saturation, hue, gain, and exposure.
 
-        You can also specify whether you want the FrameBufferThread to continuously
+        You can also specify whether you want a FrameBufferThread to continuously
         debuffer the camera.  If you specify True, the camera is essentially 'on' at
-        all times.  If you specify off, you will have to manage camera buffers.
+        all times and the last buffersize frames are kept in a ring buffer.  If you
+        specify off, you will have to manage camera buffers.
 
         **PARAMETERS**
 
@@ -444,11 +475,19 @@ class Camera(FrameSource):
 
         * *calibrationfile* - A calibration file to load.
 
+        * *buffersize* - The number of frames a threaded camera keeps, see getFrames().
+
+        * *framepool* - A FramePool, or True for a new one, to capture into
+          preallocated frames instead of allocating a new one for every image.
+
 
         """
         self.index = None
         self.threaded = False
         self.capture = None
+        if framepool is True:
+            framepool = FramePool(count=buffersize + 2)
+        self.framepool = framepool
 
         if platform.system() == "Linux" and -1 in _index and camera_index != -1 and camera_index not in _index:
             process = subprocess.Popen(["lsof /dev/video"+str(camera_index)],shell=True,stdout=subprocess.PIPE)
@@ -467,6 +506,10 @@ class Camera(FrameSource):
                 self.threaded = cam.threaded
                 self.capture = cam.capture
                 self.index = cam.index
+                self.pygame_camera = cam.pygame_camera
+                self.thread = cam.thread
+                self._buffer = cam._buffer
+                self._frameReady = cam._frameReady
                 _cameras.append(self)
                 return
 
@@ -522,11 +565,12 @@ class Camera(FrameSource):
         if (threaded):
             self.threaded = True
             _cameras.append(self)
-            if (not _camera_polling_thread):
-                _camera_polling_thread = FrameBufferThread()
-                _camera_polling_thread.daemon = True
-                _camera_polling_thread.start()
-                time.sleep(0) #yield to thread
+            self._buffer = deque(maxlen=max(buffersize, 1))
+            self._frameReady = threading.Event()
+            self.thread = FrameBufferThread(self)
+            self.thread.daemon = True
+            self.thread.start()
+            time.sleep(0) #yield to thread
 
         if calibrationfile:
             self.loadCalibration(calibrationfile)
@@ -597,9 +641,15 @@ class Camera(FrameSource):
 
         We're working on how to solve this problem.
 
+        A threaded camera returns a copy of the newest frame in its ring
+        buffer without waiting for the device. Only the very first call waits
+        for a frame, for at most frametimeout seconds. The copy can be drawn on
+        without changing the frames getFrames() returns.
+
         **RETURNS**
 
-        A SimpleCV Image from the camera.
+        A SimpleCV Image from the camera, or None if a threaded camera hasn't
+        delivered a frame within frametimeout seconds.
 
         **EXAMPLES**
 
@@ -609,19 +659,268 @@ class Camera(FrameSource):
 
         """
 
+        if (self.threaded):
+            if not self._buffer:
+                self._frameReady.wait(self.frametimeout)
+                if not self._buffer:
+                    logger.warning("Camera.getImage: the camera didn't deliver a frame in %s seconds" % str(self.frametimeout))
+                    return None
+            self.capturetime, img = self._buffer[-1]
+            retVal = img.copy()
+            retVal.camera = self
+            retVal.capturetime = self.capturetime
+            return retVal
+
         if self.pygame_camera:
             return Image(self.pygame_buffer.copy())
 
-        if (not self.threaded):
-            cv.GrabFrame(self.capture)
-            self.capturetime = time.time()
-        else:
-            self.capturetime = self._threadcapturetime
+        cv.GrabFrame(self.capture)
+        self.capturetime = time.time()
+
+        return self._wrapFrame(cv.RetrieveFrame(self.capture))
+
+    def _wrapFrame(self, frame):
+        """
+        Copy a frame retrieved from the capture, which the capture will reuse,
+        into an Image.
+        """
+        if self.framepool:
+            return self.framepool.wrap(frame, self)
+        return Image(frame, self)
+
+    def getFrames(self, since=0):
+        """
+        **SUMMARY**
+
+        Return the frames of a threaded camera that were captured after a
+        given time, oldest first.  Only the last buffersize frames are kept,
+        see the constructor.
+
+        **PARAMETERS**
+
+        * *since* - a time.time() timestamp, only newer frames are returned.
+
+        **RETURNS**
+
+        A list of SimpleCV Images, each with its capturetime set.  Unthreaded
+        cameras have no ring buffer and return an empty list.
+
+        **EXAMPLES**
+
+        >>> cam = Camera(buffersize=16)
+        >>> last = 0
+        >>> while True:
+        >>>    for img in cam.getFrames(since=last):
+        >>>        last = img.capturetime
+        >>>        img.save("frame%f.png" % last)
+
+        """
+        if not self.threaded:
+            return []
+        while True:
+            try:
+                frames = list(self._buffer)
+                break
+            except RuntimeError: #the capture thread appended while we copied
+                continue
+        return [img for capturetime, img in frames if capturetime > since]
+
+
+def _frameFingerprint(frame):
+    """
+    An 8x8 grayscale thumbnail of a video frame, used to find out which frame
+    a seek really landed on.
+    """
+    gray = cv.CreateImage(cv.GetSize(frame), cv.IPL_DEPTH_8U, 1)
+    cv.CvtColor(frame, gray, cv.CV_BGR2GRAY)
+    small = cv.CreateImage((8, 8), cv.IPL_DEPTH_8U, 1)
+    cv.Resize(gray, small, cv.CV_INTER_AREA)
+    return np.fromstring(small.tostring(), dtype=np.uint8)
+
+
+class VideoIndex(object):
+    """
+    **SUMMARY**
+
+    A seek index for a video file. Setting CV_CAP_PROP_POS_FRAMES usually
+    lands on a nearby keyframe rather than on the frame asked for. The index
+    keeps a fingerprint of every frame, so after a seek it can tell which
+    frame was really decoded and step forward to the right one. The positions
+    that turn out to land on keyframes are remembered, so later seeks near
+    them need a single try.
+
+    The index is built by decoding the whole file once and is saved in
+    cachedir (the system temp directory by default), keyed by the path, size
+    and modification time of the video.
+
+    **EXAMPLE**
+
+    >>> idx = VideoIndex("video.mpg")
+    >>> capture = cv.CaptureFromFile("video.mpg")
+    >>> frame = idx.read(capture, 1000)
+
+    """
+    version = 1
+    window = 1000 #how far before the requested frame a seek may land
+    tolerance = 64 #max L1 distance between matching fingerprints
+    retries = 6
+
+    def __init__(self, filename, cachedir=None):
+        self.filename = filename
+        if cachedir is None:
+            cachedir = os.path.join(tempfile.gettempdir(), "simplecv_video_index")
+        self.indexfile = os.path.join(cachedir, self._key() + ".npz")
+        self.fingerprints = None #(frames, 64) uint8
+        self.times = None #CV_CAP_PROP_POS_MSEC of every frame
+        self.anchors = {} #requested POS_FRAMES -> frame index it landed on
+        self._unsaved = 0
+        if not self.load():
+            self.build()
+            self.save()
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def _key(self):
+        st = os.stat(self.filename)
+        name = "%s:%d:%d" % (os.path.abspath(self.filename), st.st_size, int(st.st_mtime))
+        return hashlib.md5(name).hexdigest()
+
+    def load(self):
+        """
+        Load the index from the cache, returns False if there is none.
+        """
+        if not os.path.exists(self.indexfile):
+            return False
+        try:
+            data = np.load(self.indexfile)
+            if int(data["version"]) != self.version:
+                return False
+            self.fingerprints = data["fingerprints"]
+            self.times = data["times"]
+            self.anchors = dict((int(r), int(l)) for r, l in data["anchors"])
+        except Exception:
+            return False
+        return True
+
+    def save(self):
+        cachedir = os.path.dirname(self.indexfile)
+        if not os.path.exists(cachedir):
+            os.makedirs(cachedir)
+        anchors = np.array(sorted(self.anchors.items()), dtype=np.int64).reshape(-1, 2)
+        #the workers of decodeSegments() may save at the same time, write then rename
+        tmp = "%s.%d.tmp" % (self.indexfile, os.getpid())
+        f = open(tmp, 'wb')
+        try:
+            np.savez(f, version=self.version, fingerprints=self.fingerprints,
+                     times=self.times, anchors=anchors)
+        finally:
+            f.close()
+        os.rename(tmp, self.indexfile)
+        self._unsaved = 0
+
+    def build(self):
+        """
+        Decode the whole video once and fingerprint every frame.
+        """
+        capture = cv.CaptureFromFile(self.filename)
+        prints = []
+        times = []
+        while True:
+            frame = cv.QueryFrame(capture)
+            if not frame:
+                break
+            prints.append(_frameFingerprint(frame))
+            times.append(cv.GetCaptureProperty(capture, cv.CV_CAP_PROP_POS_MSEC))
+        self.fingerprints = np.array(prints, dtype=np.uint8).reshape(-1, 64)
+        self.times = np.array(times, dtype=np.float64)
+        self.anchors = {0: 0}
 
-        frame = cv.RetrieveFrame(self.capture)
-        newimg = cv.CreateImage(cv.GetSize(frame), cv.IPL_DEPTH_8U, 3)
-        cv.Copy(frame, newimg)
-        return Image(newimg, self)
+    def locate(self, frame, near):
+        """
+        Return the index of the frame that matches frame, searching from
+        window frames before near up to a few frames after it, or None if
+        nothing matches.
+        """
+        lo = max(near - self.window, 0)
+        hi = min(near + 16, len(self.fingerprints))
+        if lo >= hi:
+            return None
+        fp = _frameFingerprint(frame).astype(np.int32)
+        dist = np.abs(self.fingerprints[lo:hi].astype(np.int32) - fp).sum(axis=1)
+        best = np.min(dist)
+        if best > self.tolerance:
+            return None
+        #on ties, e.g. a static scene, prefer the frame closest to the request
+        candidates = np.where(dist == best)[0] + lo
+        return int(candidates[np.argmin(np.abs(candidates - near))])
+
+    def read(self, capture, index):
+        """
+        Seek capture to frame index (0 based) and return that frame. The next
+        frame read from capture is index+1. Returns None past the end.
+
+        A remembered anchor that lands just before index is used as is.
+        Otherwise the seek asks for index itself, finds the frame it really
+        landed on by its fingerprint, and asks for earlier and earlier frames
+        if it overshot. Where it lands is remembered as a new anchor.
+        """
+        if index < 0 or index >= len(self.fingerprints):
+            return None
+        margin = 16
+        request = index
+        known = [(l, r) for r, l in self.anchors.items() if l <= index and r <= index]
+        if known:
+            (landed, r) = max(known)
+            if index - landed <= margin:
+                request = r
+        for attempt in range(self.retries):
+            cv.SetCaptureProperty(capture, cv.CV_CAP_PROP_POS_FRAMES, request)
+            frame = cv.QueryFrame(capture)
+            if request == 0:
+                landed = 0
+            elif frame:
+                landed = self.locate(frame, request)
+            else:
+                landed = None
+            if landed is not None and landed <= index:
+                if request not in self.anchors:
+                    self.anchors[request] = landed
+                    self._unsaved += 1
+                    if self._unsaved >= 32:
+                        self.save()
+                for i in range(index - landed):
+                    frame = cv.QueryFrame(capture)
+                return frame
+            #landed after the frame we want, or on a broken frame: back off
+            request = max(request - margin, 0)
+            margin = margin * 4
+        return None
+
+
+def _decodeVideoSegment(filename, indexfile, segment, first, last, queue, func):
+    """
+    Worker process for VirtualCamera.decodeSegments(). Puts (segment, (frame
+    number, Image or func(Image))) on queue for frames first to last (0 based),
+    then (segment, None).
+    """
+    try:
+        index = VideoIndex(filename, os.path.dirname(indexfile))
+        capture = cv.CaptureFromFile(filename)
+        frame = index.read(capture, first)
+        number = first
+        while frame and number <= last:
+            copy = cv.CreateImage(cv.GetSize(frame), cv.IPL_DEPTH_8U, 3)
+            cv.Copy(frame, copy)
+            img = Image(copy)
+            if func is not None:
+                img = func(img)
+            queue.put((segment, (number + 1, img)))
+            number += 1
+            if number <= last:
+                frame = cv.QueryFrame(capture)
+    finally:
+        queue.put((segment, None))
 
 
 class VirtualCamera(FrameSource):
@@ -644,8 +943,15 @@ class VirtualCamera(FrameSource):
     source = ""
     sourcetype = ""
     lastmtime = 0
+    prefetch = 0
+    workers = 2
+    _prefetcher = None #ImageSet.prefetch() generator for "imageset" sources
+    _prefetchIndex = -1 #the index the prefetcher yields next
+    seekindex = False
+    _index = None #VideoIndex of a "video" source
+    _nextFrame = 0 #0 based number of the next video frame when seekindex is on
 
-    def __init__(self, s, st, start=1):
+    def __init__(self, s, st, start=1, prefetch=0, workers=2, seekindex=False, cachedir=None):
         """
         **SUMMARY**
 
@@ -656,6 +962,14 @@ class VirtualCamera(FrameSource):
         * *s* - the source of the imagery.
         * *st* - the type of the virtual camera. Valid strings include:
         * *start* - the number of the frame that you want to start with.
+        * *prefetch* - for "imageset" sources, the number of images decoded
+          ahead of getImage() on background threads. A set given as a path is
+          then loaded lazily. 0 turns prefetching off.
+        * *workers* - the number of decoding threads used when prefetching.
+        * *seekindex* - for "video" sources, make getFrame(), skipFrames() and
+          rewind() frame accurate using a VideoIndex. The index is built the
+          first time a file is used, which decodes the whole file once.
+        * *cachedir* - where the VideoIndex is kept, see VideoIndex.
 
           * "image" - a single still image.
           * "video" - a video file.
@@ -669,12 +983,17 @@ class VirtualCamera(FrameSource):
         >>> vc = VirtualCamera("./path_to_images/", "imageset")
         >>> vc = VirtualCamera("video.mpg", "video", 300)
         >>> vc = VirtualCamera("./imgs", "directory")
+        >>> vc = VirtualCamera("./path_to_images/", "imageset", prefetch=8, workers=4)
 
 
         """
         self.source = s
         self.sourcetype = st
         self.counter = 0
+        self.prefetch = prefetch
+        self.workers = workers
+        self.seekindex = seekindex
+        self.cachedir = cachedir
         if start==0:
             start=1
         self.start = start
@@ -698,9 +1017,9 @@ class VirtualCamera(FrameSource):
             elif( isinstance(s,(list,str)) ):
                 self.source = ImageSet()
                 if (isinstance(s,list)):
-                    self.source.load(*s)
+                    self.source.load(*s, lazy=prefetch > 0, cacheSize=prefetch)
                 else:
-                    self.source.load(s)
+                    self.source.load(s, lazy=prefetch > 0, cacheSize=prefetch)
             else:
                 warnings.warn('Virtual Camera is unable to figure out the contents of your ImageSet, it must be a directory, list of directories, or an ImageSet object')
             
@@ -708,7 +1027,10 @@ class VirtualCamera(FrameSource):
         elif (self.sourcetype == 'video'):
          
             self.capture = cv.CaptureFromFile(self.source)
-            cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, self.start-1)
+            if self.seekindex:
+                self._seekTo(self.start-1)
+            else:
+                cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, self.start-1)
 
         elif (self.sourcetype == 'directory'):
             pass
@@ -735,8 +1057,11 @@ class VirtualCamera(FrameSource):
             return Image(self.source, self)
 
         elif (self.sourcetype == 'imageset'):
-            print len(self.source)
-            img = self.source[self.counter % len(self.source)]
+            index = self.counter % len(self.source)
+            if self.prefetch > 0:
+                img = self._getPrefetched(index)
+            else:
+                img = self.source[index]
             self.counter = self.counter + 1
             return img
 
@@ -744,6 +1069,7 @@ class VirtualCamera(FrameSource):
             # cv.QueryFrame returns None if the video is finished
             frame = cv.QueryFrame(self.capture)
             if frame:
+                self._nextFrame += 1
                 img = cv.CreateImage(cv.GetSize(frame), cv.IPL_DEPTH_8U, 3)
                 cv.Copy(frame, img)
                 return Image(img, self)
@@ -755,6 +1081,137 @@ class VirtualCamera(FrameSource):
             self.counter = self.counter + 1
             return Image(img, self)
 
+    def _getPrefetched(self, index):
+        """
+        Return image index of an "imageset" source from the prefetcher,
+        restarting it there if rewind() or skipFrames() moved the counter.
+        """
+        if self._prefetcher is None or index != self._prefetchIndex:
+            self._prefetcher = self.source.prefetch(depth=self.prefetch, workers=self.workers,
+                                                    start=index, cycle=True)
+        self._prefetchIndex = (index + 1) % len(self.source)
+        return self._prefetcher.next()
+
+    def getVideoIndex(self):
+        """
+        **SUMMARY**
+
+        Return the VideoIndex of a "video" source, loading it from the cache or
+        building it the first time.
+
+        **RETURNS**
+
+        A VideoIndex, or None for other sources.
+
+        **EXAMPLES**
+
+        >>> cam = VirtualCamera("filename.avi", "video")
+        >>> len(cam.getVideoIndex()) # the number of frames
+
+        """
+        if self.sourcetype != 'video':
+            return None
+        if self._index is None:
+            self._index = VideoIndex(self.source, self.cachedir)
+        return self._index
+
+    def _seekTo(self, index):
+        """
+        Frame accurately make frame index (0 based) the next one getImage() reads.
+        """
+        index = max(index, 0)
+        if index == 0:
+            cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, 0)
+        else:
+            self.getVideoIndex().read(self.capture, index-1)
+        self._nextFrame = index
+
+    def decodeSegments(self, segments=None, func=None, depth=16):
+        """
+        **SUMMARY**
+
+        Split a video into segments and decode each one in its own process.
+        The frames come back in order together with their frame numbers (as
+        used by getFrame()). Each worker seeks to its segment with the
+        VideoIndex, so the split is frame accurate.
+
+        Sending whole frames back between processes is expensive, so pass a
+        func to run your analysis in the workers and only get its results back.
+
+        **PARAMETERS**
+
+        * *segments* - the number of segments and worker processes, the number
+          of CPUs by default.
+        * *func* - a function taking an Image, run in the worker processes. It
+          must be picklable, i.e. defined at the top level of a module.
+        * *depth* - how many results each worker may have in flight. Results that
+          arrive before it is their turn are kept until the earlier segments are
+          done, so every worker decodes at full speed.
+
+        **RETURNS**
+
+        A generator of (frame number, Image) tuples, or (frame number, func(Image)).
+
+        **EXAMPLES**
+
+        >>> def countBlobs(img):
+        >>>     return len(img.findBlobs() or [])
+        >>> cam = VirtualCamera("archive.avi", "video")
+        >>> for number, count in cam.decodeSegments(4, countBlobs):
+        >>>     print number, count
+
+        """
+        if self.sourcetype != 'video':
+            warnings.warn("VirtualCamera.decodeSegments: only video sources can be split into segments.")
+            return
+        index = self.getVideoIndex()
+        total = len(index)
+        if segments is None:
+            segments = multiprocessing.cpu_count()
+        segments = max(min(segments, total), 1)
+        step = int(math.ceil(total / float(segments)))
+        starts = range(0, total, step)
+        #one queue for all the workers, drained all the time, so no worker
+        #waits on the consumer while an earlier segment is being yielded
+        queue = multiprocessing.Queue(depth * len(starts))
+        workers = []
+        for segment in range(len(starts)):
+            first = starts[segment]
+            proc = multiprocessing.Process(target=_decodeVideoSegment,
+                args=(self.source, index.indexfile, segment, first, min(first + step, total) - 1, queue, func))
+            proc.daemon = True
+            proc.start()
+            workers.append(proc)
+        pending = [deque() for proc in workers] # results waiting for their turn
+        done = [False] * len(workers)
+        try:
+            current = 0
+            while current < len(workers):
+                if pending[current]:
+                    yield pending[current].popleft()
+                    continue
+                if done[current]:
+                    workers[current].join()
+                    current += 1
+                    continue
+                try:
+                    (segment, item) = queue.get(timeout=1.0)
+                except Empty:
+                    #a worker that was killed never sends its end marker
+                    for segment in range(len(workers)):
+                        if not done[segment] and not workers[segment].is_alive():
+                            warnings.warn("VirtualCamera.decodeSegments: the worker for segment %d died, its frames are missing." % segment)
+                            done[segment] = True
+                    continue
+                if item is None:
+                    done[segment] = True
+                else:
+                    pending[segment].append(item)
+        finally:
+            for proc in workers:
+                if proc.is_alive():
+                    proc.terminate()
+
     def rewind(self, start=None):
         """
         **SUMMARY**
@@ -783,7 +1240,11 @@ class VirtualCamera(FrameSource):
         >>> cam.rewind()
 
         """
-        if (self.sourcetype == 'video'):
+        if (self.sourcetype == 'video' and self.seekindex):
+            if not start:
+                start = self.start
+            self._seekTo(max(start, 1)-1)
+        elif (self.sourcetype == 'video'):
             if not start:
                 cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, self.start-1)
             else:
@@ -815,7 +1276,13 @@ class VirtualCamera(FrameSource):
         >>> cam.getFrame(400).show()
 
         """
-        if (self.sourcetype == 'video'):
+        if (self.sourcetype == 'video' and self.seekindex):
+            number_frame = self._nextFrame
+            self._seekTo(frame-1)
+            img = self.getImage()
+            self._seekTo(number_frame)
+            return img
+        elif (self.sourcetype == 'video'):
             number_frame = int(cv.GetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES))
             cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, frame-1)
             img = self.getImage()
@@ -856,7 +1323,9 @@ class VirtualCamera(FrameSource):
         >>> cam.getImage().show()
 
         """
-        if (self.sourcetype == 'video'):
+        if (self.sourcetype == 'video' and self.seekindex):
+            self._seekTo(self._nextFrame + n - 1)
+        elif (self.sourcetype == 'video'):
             number_frame = int(cv.GetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES))
             cv.SetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES, number_frame + n - 1)
         elif (self.sourcetype == 'imageset'):
@@ -886,7 +1355,9 @@ class VirtualCamera(FrameSource):
         >>> cam.getFrameNumber()
 
         """
-        if (self.sourcetype == 'video'):
+        if (self.sourcetype == 'video' and self.seekindex):
+            return self._nextFrame
+        elif (self.sourcetype == 'video'):
             number_frame = int(cv.GetCaptureProperty(self.capture, cv.CV_CAP_PROP_POS_FRAMES))
             return number_frame
         else:
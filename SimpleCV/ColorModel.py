@@ -21,11 +21,13 @@ class ColorModel:
     mIsBackground = True
     mData = {}
     mBits = 1
+    mLUT = None # boolean lookup table indexed by the shifted B,G,R values, built from mData
 
     def __init__(self, data = None, isBackground=True):
         self.mIsBackground = isBackground
         self.mData = {}
         self.mBits = 1
+        self.mLUT = None
 
         if data:
             try:
@@ -39,6 +41,16 @@ class ColorModel:
         Turn input types in a common form used by the rest of the class -- a
         4-bit shifted list of unique colors
         """
+        uniques = self._canonicalColors(data)
+        if uniques is None:
+            return None
+        #create a dict of encoded strings
+        return dict.fromkeys(map(np.ndarray.tostring, uniques), 1)
+
+    def _canonicalColors(self, data):
+        """
+        The unique shifted colors of the input as an N x 3 array of B,G,R.
+        """
         ret = ''
 
         #first cast everything to a numpy array
@@ -65,11 +77,23 @@ class ColorModel:
         if( len(rs.shape) > 1 ):
             uniques = np.unique(rs.view([('',rs.dtype)]*rs.shape[1])).view(rs.dtype).reshape(-1, 3)
         else:
-            uniques = [rs]
+            uniques = rs.reshape(-1, 3)
         #create a unique set of colors.  I had to look this one up
+        return uniques
 
-        #create a dict of encoded strings
-        return dict.fromkeys(map(np.ndarray.tostring, uniques), 1)
+    def _getLUT(self):
+        """
+        The lookup table of the model, with one entry per shifted color that
+        is True for the colors in the model. It is built from mData when
+        needed and kept up to date by add() and remove().
+        """
+        if( self.mLUT is None ):
+            n = 256 >> self.mBits
+            self.mLUT = np.zeros((n, n, n), dtype=bool)
+            if self.mData:
+                colors = np.fromstring(''.join(self.mData.keys()), dtype=np.uint8).reshape(-1, 3)
+                self.mLUT[colors[:,0], colors[:,1], colors[:,2]] = True
+        return self.mLUT
 
     def reset(self):
         """
@@ -89,6 +113,7 @@ class ColorModel:
 
         """
         self.mData = {}
+        self.mLUT = None
 
     def add(self, data):
         """
@@ -111,7 +136,11 @@ class ColorModel:
         >>> cm.clear()
 
         """
-        self.mData.update(self._makeCanonical(data))
+        colors = self._canonicalColors(data)
+        if colors is None:
+            return
+        self.mData.update(dict.fromkeys(map(np.ndarray.tostring, colors), 1))
+        self._getLUT()[colors[:,0], colors[:,1], colors[:,2]] = True
 
     def remove(self, data):
         """
@@ -134,14 +163,21 @@ class ColorModel:
         >>> cm.remove(Color.BLACK)
 
         """
-        self.mData = dict.fromkeys(set(self.mData) ^ set(self._makeCanonical(data)), 1)
+        colors = self._canonicalColors(data)
+        if colors is None:
+            return
+        #built before mData changes, or a new table would already hold the result
+        lut = self._getLUT()
+        self.mData = dict.fromkeys(set(self.mData) ^ set(map(np.ndarray.tostring, colors)), 1)
+        #the same symmetric difference as mData, the colors are unique
+        lut[colors[:,0], colors[:,1], colors[:,2]] = ~lut[colors[:,0], colors[:,1], colors[:,2]]
 
     def threshold(self, img):
         """
         **SUMMARY**
 
-        Perform a threshold operation on the given image. This involves iterating
-        over the image and comparing each pixel to the model. If the pixel is in the
+        Perform a threshold operation on the given image. Each pixel is looked up
+        in the model's lookup table. If the pixel is in the
         model it is set to be either the foreground (white) or background (black) based
         on the setting of mIsBackground.
 
@@ -168,8 +204,8 @@ class ColorModel:
             a = 255
             b = 0
 
-        rs = np.right_shift(img.getNumpy(), self.mBits).reshape(-1, 3) #bitshift down and reshape to Nx3
-        mapped = np.array(map(self.mData.has_key, map(np.ndarray.tostring, rs))) #map to True/False based on the model
+        rs = np.right_shift(img.getNumpy(), self.mBits) #bitshift down
+        mapped = self._getLUT()[rs[:,:,0], rs[:,:,1], rs[:,:,2]] #map to True/False based on the model
         thresh = np.where(mapped, a, b) #replace True and False with fg and bg
         return Image(thresh.reshape(img.width, img.height))
 
@@ -197,8 +233,9 @@ class ColorModel:
 
 
        """
-        #reverse the color, cast to uint8, right shift, convert to string, check dict
-        return self.mData.has_key(np.right_shift(np.cast['uint8'](c[::-1]), self.mBits).tostring())
+        #reverse the color, cast to uint8, right shift, look it up
+        rs = np.right_shift(np.cast['uint8'](c[::-1]), self.mBits)
+        return bool(self._getLUT()[rs[0], rs[1], rs[2]])
 
     def setIsForeground(self):
         """
@@ -257,6 +294,7 @@ class ColorModel:
 
         """
         self.mData =  load(open(filename))
+        self.mLUT = None
 
     def save(self, filename):
         """
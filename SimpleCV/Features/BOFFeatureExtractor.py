@@ -29,7 +29,8 @@ class BOFFeatureExtractor(object):
         self.mPatchSize = patchsz
         self.mNumCodes = numcodes
 
-    def generate(self,imgdirs,numcodes=128,sz=(11,11),imgs_per_dir=50,img_layout=(8,16),padding=0, verbose=True):
+    def generate(self,imgdirs,numcodes=128,sz=(11,11),imgs_per_dir=50,img_layout=(8,16),padding=0, verbose=True,
+                 batchsize=None,workers=1,passes=1,checkpoint=None,resume=False,prior=None):
         """
         This method builds the bag of features codebook from a list of directories
         with images in them. Each directory should be broken down by image class.
@@ -42,6 +43,18 @@ class BOFFeatureExtractor(object):
         * padding:the pixel padding of each patch in the resulting image.
         * imgs_per_dir: this method can use a specified number of images per directory
         * verbose: print output
+        * batchsize: if not None, build the codebook with mini-batch k-means,
+          streaming the patches in batches of about this many instead of
+          loading them all. This takes far less time and memory.
+        * workers: with batchsize, read the images with this many processes.
+        * passes: with batchsize, the number of passes over the images.
+        * checkpoint: with batchsize, a .npz file the partial codebook is saved
+          to after every batch.
+        * resume: with batchsize, continue from the checkpoint, or if there is
+          none from the current codebook, e.g. one read by load().
+        * prior: when resuming from the current codebook, the number of patches
+          each code counts as having seen already, batchsize by default. The
+          larger it is the less the new patches move a converged codebook.
 
 
         Once the method has completed it will save the results to a local file
@@ -50,7 +63,7 @@ class BOFFeatureExtractor(object):
 
         WARNING:
 
-            THIS METHOD WILL TAKE FOREVER
+            THIS METHOD WILL TAKE FOREVER, UNLESS YOU SET batchsize
         """
         if( numcodes != img_layout[0]*img_layout[1]):
             warnings.warn("Numcodes must match the size of image layout.")
@@ -60,6 +73,17 @@ class BOFFeatureExtractor(object):
         self.mLayout = img_layout
         self.mNumCodes = numcodes
         self.mPatchSize = sz
+        if( batchsize is not None ):
+            files = []
+            for path in imgdirs:
+                found = []
+                for ext in IMAGE_FORMATS:
+                    found.extend(glob.glob( os.path.join(path, ext)))
+                files.extend(found[0:imgs_per_dir])
+            self.mCodebook = self._makeCodebookStreaming(files,numcodes,batchsize,workers,passes,checkpoint,resume,verbose,prior)
+            self.mCodebookImg = self._codebook2Img(self.mCodebook,self.mPatchSize,self.mNumCodes,self.mLayout,self.mPadding)
+            self.mCodebookImg.save('codebook.png')
+            return
         rawFeatures = np.zeros(sz[0]*sz[1])#fakeout numpy so we can use vstack
         for path in imgdirs:
             fcount = 0
@@ -109,6 +133,106 @@ class BOFFeatureExtractor(object):
         [centroids, membership] = cluster.kmeans2(data,ncodes, minit='points')
         return(centroids)
 
+    def _makeCodebookStreaming(self,files,ncodes,batchsize,workers=1,passes=1,checkpoint=None,resume=False,verbose=False,prior=None):
+        """
+        Mini-batch k-means over the patches of a list of image files. The
+        images are read a few at a time, by a pool of workers processes, and
+        each batch of about batchsize patches moves the codes they are
+        nearest to towards their mean, weighted by how many patches each code
+        has seen so far. Only one batch is in memory at a time. A codebook
+        resumed from self.mCodebook starts with prior patches per code.
+        """
+        if checkpoint is not None and not checkpoint.endswith(".npz"):
+            checkpoint = checkpoint + ".npz"
+        centroids = None
+        counts = None
+        start = (0, 0) # the pass and file to carry on from
+        if resume:
+            if checkpoint is not None and os.path.exists(checkpoint):
+                state = np.load(checkpoint)
+                centroids = state['codebook']
+                counts = state['counts']
+                start = tuple(state['position'])
+            elif self.mCodebook is not None:
+                centroids = np.array(self.mCodebook, dtype=np.float64)
+                #we don't know how many patches made the codebook, a whole batch
+                #per code keeps the first batches from undoing it
+                if prior is None:
+                    prior = batchsize
+                counts = np.ones(len(centroids)) * float(prior)
+            if centroids is not None and centroids.shape != (ncodes, self.mPatchSize[0]*self.mPatchSize[1]):
+                warnings.warn("The codebook to resume from doesn't match numcodes and sz, starting over.")
+                centroids = None
+                start = (0, 0)
+
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+        step = max(workers, 1) * 2 # images read at once
+        try:
+            for p in range(start[0], passes):
+                first = start[1] if p == start[0] else 0
+                buffered = []
+                nbuffered = 0
+                for i in range(first, len(files), step):
+                    jobs = [(f, self.mPatchSize) for f in files[i:i+step]]
+                    if verbose:
+                        print "Pass " + str(p+1) + " of " + str(passes) + ", image " + str(i) + " of " + str(len(files))
+                    if pool is not None:
+                        patches = pool.map(_bofPatches, jobs)
+                    else:
+                        patches = map(_bofPatches, jobs)
+                    buffered.extend(patches)
+                    nbuffered += sum([len(x) for x in patches])
+                    last = (i + step >= len(files))
+                    if( nbuffered < batchsize and not last ):
+                        continue
+                    if( centroids is None and nbuffered < ncodes and not last ):
+                        continue
+                    if( nbuffered == 0 ):
+                        continue
+                    batch = np.vstack(buffered).astype(np.float64)
+                    buffered = []
+                    nbuffered = 0
+                    if( centroids is None ):
+                        if len(batch) < ncodes:
+                            warnings.warn("There are fewer patches than codes, some codes are repeated.")
+                            seeds = np.random.randint(0, len(batch), ncodes)
+                        else:
+                            seeds = np.random.permutation(len(batch))[0:ncodes]
+                        centroids = batch[seeds].copy()
+                        counts = np.zeros(ncodes)
+                    self._updateCodebook(centroids, counts, batch)
+                    if( checkpoint is not None ):
+                        position = (p, i + step) if not last else (p + 1, 0)
+                        tmp = checkpoint + "." + str(os.getpid())
+                        f = open(tmp, 'wb')
+                        np.savez(f, codebook=centroids, counts=counts, position=np.array(position))
+                        f.close()
+                        os.rename(tmp, checkpoint)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        if( centroids is None ):
+            warnings.warn("No patches were found to build the codebook from.")
+        return centroids
+
+    def _updateCodebook(self, centroids, counts, batch):
+        """
+        One mini-batch k-means step, in place: every code moves towards the
+        mean of its patches in the batch by the share of all its patches
+        that are in the batch.
+        """
+        ncodes = len(centroids)
+        codes = _nearestCodes(batch, centroids)
+        n = np.bincount(codes, minlength=ncodes)
+        sums = np.array([np.bincount(codes, weights=batch[:, d], minlength=ncodes)
+                         for d in range(batch.shape[1])]).T
+        hit = n > 0
+        counts[hit] += n[hit]
+        centroids[hit] += (sums[hit] - n[hit, np.newaxis] * centroids[hit]) / counts[hit, np.newaxis]
+
     def _img2Codebook(self, img, patchsize, count, patch_arrangement, spacersz):
         """
         img = the image
@@ -262,11 +386,29 @@ class BOFFeatureExtractor(object):
         the provided codebook. The result are the bin counts for each codebook code.
         """
         data = self._getPatches(img)
-        p = spsd.cdist(data,self.mCodebook)
-        codes = np.argmin(p,axis=1)
+        codes = _nearestCodes(data,self.mCodebook)
         [retVal,foo] = np.histogram(codes,self.mNumCodes,normed=True,range=(0,self.mNumCodes-1))
         return retVal
 
+    def extractBatch(self, imgs):
+        """
+        Extract the bag of features histograms of a list of images at once.
+        The patches of all the images are matched to the codebook together,
+        in chunks, which is quicker than calling extract() on each image.
+        Returns an (images x codes) array, the rows in the same order as imgs.
+        """
+        patches = [self._getPatches(img) for img in imgs]
+        retVal = np.zeros((len(imgs),self.mNumCodes))
+        if not len(imgs):
+            return retVal
+        codes = _nearestCodes(np.vstack(patches),self.mCodebook)
+        start = 0
+        for i in range(len(imgs)):
+            end = start + len(patches[i])
+            [retVal[i],foo] = np.histogram(codes[start:end],self.mNumCodes,normed=True,range=(0,self.mNumCodes-1))
+            start = end
+        return retVal
+
     def reconstruct(self,img):
         """
         This is a "just for fun" method as a sanity check for the BOF codeook.
@@ -275,9 +417,7 @@ class BOFFeatureExtractor(object):
         """
         retVal = cv.CreateImage((img.width,img.height), cv.IPL_DEPTH_8U, 1)
         data = self._getPatches(img)
-        p = spsd.cdist(data,self.mCodebook)
-        foo = p.shape[0]
-        codes = np.argmin(p,axis=1)
+        codes = _nearestCodes(data,self.mCodebook)
         count = 0
         wsteps = img.width/self.mPatchSize[0]
         hsteps = img.height/self.mPatchSize[1]
@@ -313,3 +453,30 @@ class BOFFeatureExtractor(object):
         This method returns the total number of fields in the feature vector.
         """
         return self.mNumCodes
+
+
+def _bofPatches(job):
+    """
+    The patches of an image file, run by the workers of generate().
+    """
+    (path, sz) = job
+    return BOFFeatureExtractor(patchsz=sz)._getPatches(Image(path), sz)
+
+
+def _nearestCodes(data, codebook, maxsize=4*1024*1024):
+    """
+    The index of the nearest code of the codebook to each row of data. The
+    squared distances are expanded as |x|^2 - 2 x.c + |c|^2 so they come from
+    one matrix product, and are computed a chunk of rows at a time so the
+    distance matrix never has more than maxsize entries.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    codebook = np.asarray(codebook, dtype=np.float64)
+    retVal = np.zeros(len(data), dtype=np.int64)
+    #|x|^2 is the same for every code, so it doesn't change the nearest one
+    csq = np.sum(codebook * codebook, axis=1)
+    chunk = max(1, int(maxsize / max(len(codebook), 1)))
+    for start in range(0, len(data), chunk):
+        dist = csq - 2 * np.dot(data[start:start+chunk], codebook.T)
+        retVal[start:start+chunk] = np.argmin(dist, axis=1)
+    return retVal
@@ -32,9 +32,9 @@ class Blob(Feature):
     :py:meth:`findBlobsFromMask`
 
     """
-    seq = '' #the cvseq object that defines this blob
+    seq = None #the cvseq object that defines this blob
     mContour = [] # the blob's outer perimeter as a set of (x,y) tuples
-    mConvexHull = [] # the convex hull contour as a set of (x,y) tuples
+    # mConvexHull - the convex hull contour as a set of (x,y) tuples, computed on first use
     mMinRectangle = [] #the smallest box rotated to fit the blob
     # mMinRectangle[0] = centroid (x,y)
     # mMinRectangle[1] = (w,h)
@@ -52,10 +52,11 @@ class Blob(Feature):
     m02 = 0
     m21 = 0
     m12 = 0
-    mContourAppx = None
+    # mContourAppx - the approximated contour, computed on first use
+    mAppxLevel = 3
     mLabel = "" # A user label
     mLabelColor = [] # what color to draw the label
-    mAvgColor = []#The average color of the blob's area.
+    # mAvgColor - the average color of the blob's area, computed on first use
     #mImg =  '' #Image()# the segmented image of the blob
     #mHullImg = '' # Image() the image from the hull.
     #mMask = '' #Image()# A mask of the blob area
@@ -64,14 +65,14 @@ class Blob(Feature):
     #mVertEdgeHist = [] #vertical edge histogram
     #mHortEdgeHist = [] #horizontal edge histgram
     pickle_skip_properties = set(
-        ('mImg', 'mHullImg', 'mMask', 'mHullMask'))
+        ('mImg', 'mHullImg', 'mMask', 'mHullMask', 'seq'))
+    #lazy attributes that are cheap to store, so they are pickled
+    pickle_lazy_properties = ('mConvexHull', 'mContourAppx', 'mAvgColor')
 
     def __init__(self):
         self._scdescriptors = None
         self.mContour = []
-        self.mConvexHull = []
         self.mMinRectangle = [-1,-1,-1,-1,-1] #angle from this
-        self.mContourAppx = []
         self.mHu = [-1,-1,-1,-1,-1,-1,-1]
         self.mPerimeter = 0
         self.mArea = 0
@@ -85,8 +86,8 @@ class Blob(Feature):
         self.m12 = 0
         self.mLabel = "UNASSIGNED"
         self.mLabelColor = []
-        self.mAvgColor = [-1,-1,-1]
         self.image = None
+        self.seq = None
         self.mHoleContour = []
         self.points = []
         #TODO
@@ -96,6 +97,8 @@ class Blob(Feature):
 
     def __getstate__(self):
         skip = self.pickle_skip_properties
+        for k in self.pickle_lazy_properties:
+            getattr(self, k) #the contour sequence isn't pickled, so compute them now
         newdict = {}
         for k,v in self.__dict__.items():
             if k in skip:
@@ -509,6 +512,9 @@ class Blob(Feature):
         self.mHullImg = self.mHullImg.rotate(angle,mode,point)
         self.mMask = self.mMask.rotate(angle,mode,point)
         self.mHullMask = self.mHullMask.rotate(angle,mode,point)
+        #read the lazy hull before the contour changes, or it would be built
+        #from the rotated contour and then rotated again
+        hull = self.mConvexHull
 
         self.mContour = map(lambda x:
                             (x[0]*np.cos(theta)-x[1]*np.sin(theta),
@@ -517,7 +523,9 @@ class Blob(Feature):
         self.mConvexHull = map(lambda x:
                                (x[0]*np.cos(theta)-x[1]*np.sin(theta),
                                 x[0]*np.sin(theta)+x[1]*np.cos(theta)),
-                               self.mConvexHull)
+                               hull)
+        #the approximation is built again from the rotated contour when needed
+        self.__dict__.pop('mContourAppx', None)
 
         if( self.mHoleContour is not None):
             for h in self.mHoleContour:
@@ -910,6 +918,37 @@ class Blob(Feature):
         """
         return float(np.mean(spsd.cdist(self.mConvexHull, [self.centroid()])))
 
+    @LazyProperty
+    def mConvexHull(self):
+        if len(self.mContour) < 3:
+            return list(self.mContour)
+        return list(cv.ConvexHull2(self.mContour, cv.CreateMemStorage(), return_points=1))
+
+    @LazyProperty
+    def mContourAppx(self):
+        retVal = []
+        if not self.mContour:
+            return retVal
+        try:
+            import cv2
+            appx = cv2.approxPolyDP(np.array([self.mContour],'float32'),self.mAppxLevel,True)
+            for p in appx:
+                retVal.append((int(p[0][0]),int(p[0][1])))
+        except:
+            pass
+        return retVal
+
+    @LazyProperty
+    def mAvgColor(self):
+        if self.image is None or not self.mContour:
+            return [-1,-1,-1]
+        x, y = self.topLeftCorner()
+        bmp = self.image.getBitmap()
+        cv.SetImageROI(bmp,(x, y, self.width(), self.height()))
+        avg = cv.Avg(bmp,self.mMask._getGrayscaleBitmap())
+        cv.ResetImageROI(bmp)
+        return avg[0:3]
+
     @LazyProperty
     def mImg(self):
         #NOTE THAT THIS IS NOT PERFECT - ISLAND WITH A LAKE WITH AN ISLAND WITH A LAKE STUFF
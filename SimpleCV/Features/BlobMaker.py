@@ -65,10 +65,6 @@ class BlobMaker:
         maxSize  - The maximum blob size in pixels.
         * *appx_level* - The blob approximation level - an integer for the maximum distance between the true edge and the approximation edge - lower numbers yield better approximation.
         """
-        #If you hit this recursion limit may god have mercy on your soul.
-        #If you really are having problems set the value higher, but this means
-        # you have over 10,000,000 blobs in your image.
-        sys.setrecursionlimit(5000)
         #h_next moves to the next external contour
         #v_next() moves to the next internal contour
         if (maxsize <= 0):
@@ -90,52 +86,100 @@ class BlobMaker:
             return retVal
 
         seq = cv.FindContours( binaryImg._getGrayscaleBitmap(), self.mMemStorage, cv.CV_RETR_TREE, cv.CV_CHAIN_APPROX_SIMPLE)
-        if not list(seq):
-            warnings.warn("Unable to find Blobs. Retuning Empty FeatureSet.")
-            return FeatureSet([])
         try:
-            # note to self
-            # http://code.activestate.com/recipes/474088-tail-call-optimization-decorator/
-            retVal = self._extractFromBinary(seq,False,colorImg,minsize,maxsize,appx_level)
-        except RuntimeError,e:
-            logger.warning("You exceeded the recursion limit. This means you probably have too many blobs in your image. We suggest you do some morphological operations (erode/dilate) to reduce the number of blobs in your image. This function was designed to max out at about 5000 blobs per image.")
-        except e:
+            if not list(seq):
+                warnings.warn("Unable to find Blobs. Retuning Empty FeatureSet.")
+                return FeatureSet([])
+            (seqs, parent, firstChild, nextSibling, depth) = self._contourTree(seq)
+            retVal = self._extractFromTree(seqs, firstChild, nextSibling, depth, colorImg, minsize, maxsize, appx_level)
+        except Exception, e:
             logger.warning("SimpleCV Find Blobs Failed - This could be an OpenCV python binding issue")
-        del seq
+        finally:
+            #the blobs copy what they need out of the sequences, so the
+            #storage can be reused by the next call
+            del seq
+            cv.ClearMemStorage(self.mMemStorage)
         return FeatureSet(retVal)
 
-    def _extractFromBinary(self, seq, isaHole, colorImg,minsize,maxsize,appx_level):
+    def _contourTree(self, seq):
         """
-        The recursive entry point for the blob extraction. The blobs and holes are presented
-        as a tree and we traverse up and across the tree.
+        Walk the contour tree with an explicit stack and return it as flat
+        arrays: the list of contour sequences and, for each one, the index of
+        its parent, first child and next sibling (-1 if there is none) and its
+        depth. Contours at even depths are blobs, at odd depths holes.
+        The contours are listed in the same order the old recursive walk
+        visited them.
+        """
+        seqs = []
+        parent = []
+        firstChild = []
+        nextSibling = []
+        depth = []
+        stack = [(seq, -1, 0)]
+        while stack:
+            (seq, par, level) = stack.pop()
+            prev = -1
+            children = []
+            while seq is not None:
+                i = len(seqs)
+                seqs.append(seq)
+                parent.append(par)
+                firstChild.append(-1)
+                nextSibling.append(-1)
+                depth.append(level)
+                if prev >= 0:
+                    nextSibling[prev] = i
+                elif par >= 0:
+                    firstChild[par] = i
+                prev = i
+                child = seq.v_next()
+                if child is not None:
+                    children.append((child, i, level+1))
+                seq = seq.h_next()
+            stack.extend(reversed(children))
+        return (seqs, np.array(parent, dtype=np.int32), np.array(firstChild, dtype=np.int32),
+                np.array(nextSibling, dtype=np.int32), np.array(depth, dtype=np.int32))
+
+    def _extractFromTree(self, seqs, firstChild, nextSibling, depth, colorImg, minsize, maxsize, appx_level):
+        """
+        Build the blobs from the flattened contour tree. The holes of a blob
+        are its children in the tree.
         """
         retVal = []
-
-        if( seq is None ):
-            return retVal
-
-        nextLayerDown = []
-        while True:
-            if( not isaHole ): #if we aren't a hole then we are an object, so get and return our featuress
-                temp =  self._extractData(seq,colorImg,minsize,maxsize,appx_level)
-                if( temp is not None ):
-                    retVal.append(temp)
-
-            nextLayer = seq.v_next()
-
-            if nextLayer is not None:
-                nextLayerDown.append(nextLayer)
-
-            seq = seq.h_next()
-
-            if seq is None:
-                break
-
-        for nextLayer in nextLayerDown:
-            retVal += self._extractFromBinary(nextLayer, not isaHole, colorImg, minsize,maxsize,appx_level)
-
+        for i in np.nonzero(depth % 2 == 0)[0]:
+            blob = self._extractData(seqs[i],colorImg,minsize,maxsize,appx_level)
+            if blob is None:
+                continue
+            holes = None
+            hole = firstChild[i]
+            if hole >= 0:
+                holes = [list(seqs[hole])]
+                hole = nextSibling[hole]
+                while hole >= 0:
+                    temp = list(seqs[hole])
+                    if( len(temp) >= 3 ): #exclude single pixel holes
+                        holes.append(temp)
+                    hole = nextSibling[hole]
+            blob.mHoleContour = holes
+            retVal.append(blob)
         return retVal
 
+    def extractTable(self, binaryImg, colorImg, minsize = 5, maxsize = -1):
+        """
+        This method labels the blobs of a binary image in a single vectorized
+        pass and returns them as a BlobTable rather than as Blob features. It
+        has no recursion limit and is much faster on images with many blobs.
+        binaryImg - The binary image with the blobs.
+        colorImg - The color image, used for the mean colors.
+        minSize  - The minimum size of the blobs in pixels.
+        maxSize  - The maximum blob size in pixels.
+        """
+        if (maxsize <= 0):
+            maxsize = colorImg.width * colorImg.height
+        columns = _labelBlobs(binaryImg.getGrayNumpyCv2(), colorImg.getNumpyCv2())
+        table = BlobTable(colorImg, *columns)
+        return table.filter(minsize, maxsize).sortArea()
+
     def _extractData(self,seq,color,minsize,maxsize,appx_level):
         """
         Extract the bulk of the data from a give blob. If the blob's are is too large
@@ -156,17 +200,10 @@ class BlobMaker:
         retVal.x = bb[0]+(bb[2]/2)
         retVal.y = bb[1]+(bb[3]/2)
         retVal.mPerimeter = cv.ArcLength(seq)
-        if( seq is not None):  #KAS
-            retVal.mContour = list(seq)
-            try:
-                import cv2
-                if( retVal.mContour is not None):
-                    retVal.mContourAppx = []
-                    appx = cv2.approxPolyDP(np.array([retVal.mContour],'float32'),appx_level,True)
-                    for p in appx:
-                        retVal.mContourAppx.append((int(p[0][0]),int(p[0][1])))
-            except:
-                pass
+        #the hull, approximation, average color and masks are computed by the
+        #blob from its contour when they are first used
+        retVal.mContour = list(seq)
+        retVal.mAppxLevel = appx_level
 
         # so this is a bit hacky....
 
@@ -181,18 +218,6 @@ class BlobMaker:
         hh = bb[3]
         retVal.points = [(xx,yy),(xx+ww,yy),(xx+ww,yy+hh),(xx,yy+hh)]
         retVal._updateExtents()
-        chull = cv.ConvexHull2(seq,cv.CreateMemStorage(),return_points=1)
-        retVal.mConvexHull = list(chull)
-        # KAS -- FLAG FOR REPLACE 6/6/2012
-        #hullMask = self._getHullMask(chull,bb)
-
-        # KAS -- FLAG FOR REPLACE 6/6/2012
-        #retVal.mHullImg = self._getBlobAsImage(chull,bb,color.getBitmap(),hullMask)
-
-        # KAS -- FLAG FOR REPLACE 6/6/2012
-        #retVal.mHullMask = Image(hullMask)
-
-        del chull
 
         moments = cv.Moments(seq)
 
@@ -217,42 +242,11 @@ class BlobMaker:
             retVal.m12 = cv.GetSpatialMoment(moments,1,2)
 
         retVal.mHu = cv.GetHuMoments(moments)
-
-
-        # KAS -- FLAG FOR REPLACE 6/6/2012
-        mask = self._getMask(seq,bb)
-        #retVal.mMask = Image(mask)
-
-        retVal.mAvgColor = self._getAvg(color.getBitmap(),bb,mask)
-        retVal.mAvgColor = retVal.mAvgColor[0:3]
-        #retVal.mAvgColor = self._getAvg(color.getBitmap(),retVal.mBoundingBox,mask)
-        #retVal.mAvgColor = retVal.mAvgColor[0:3]
-
-        # KAS -- FLAG FOR REPLACE 6/6/2012
-        #retVal.mImg = self._getBlobAsImage(seq,bb,color.getBitmap(),mask)
-
-        retVal.mHoleContour = self._getHoles(seq)
         retVal.mAspectRatio = retVal.mMinRectangle[1][0]/retVal.mMinRectangle[1][1]
 
         return retVal
 
 
-    def _getHoles(self,seq):
-        """
-        This method returns the holes associated with a blob as a list of tuples.
-        """
-        retVal = None
-        holes = seq.v_next()
-        if( holes is not None ):
-            retVal = [list(holes)]
-            while( holes.h_next() is not None ):
-                holes = holes.h_next();
-                temp = list(holes)
-                if( len(temp) >= 3 ): #exclude single pixel holes
-                    retVal.append(temp)
-        return retVal
-
-
     def _getMask(self,seq,bb):
         """
         Return a binary image of a particular contour sequence.
@@ -306,3 +300,4 @@ class BlobMaker:
 from SimpleCV.ImageClass import Image
 from SimpleCV.Features.Features import FeatureSet
 from SimpleCV.Features.Blob import Blob
+from SimpleCV.Features.BlobTable import BlobTable, _labelBlobs
@@ -0,0 +1,324 @@
+from SimpleCV.base import *
+from SimpleCV.ImageClass import Image
+from SimpleCV.Features.FeatureExtractorBase import *
+from SimpleCV.Features.FeatureExtractorBase import _extractorConfig
+
+class FeatureStore(object):
+    """
+    **SUMMARY**
+
+    A FeatureStore keeps the feature vectors of images in a directory, one
+    memory mapped table of floats per feature extractor configuration, so
+    they can be shared by every run that uses the same extractors on the
+    same images. Each table holds at most maxentries vectors, when it is
+    full the least recently used vector is replaced.
+
+    A store should only be written by one process at a time. A copy of a
+    store that is pickled, e.g. into the worker processes of
+    train(workers=N), only reads the tables; the vectors it is given are kept
+    in its pending list, and train() puts them into the original store.
+
+    **PARAMETERS**
+
+    * *path* - the directory to keep the tables in, it is created if needed.
+    * *maxentries* - the largest number of vectors kept per extractor.
+
+    **EXAMPLE**
+
+    >>> store = FeatureStore("./features/", maxentries=50000)
+    >>> hue = CachedFeatureExtractor(HueHistogramFeatureExtractor(), store)
+    >>> edge = CachedFeatureExtractor(EdgeHistogramFeatureExtractor(), store)
+    >>> svm = SVMClassifier([hue, edge])
+
+    **SEE ALSO**
+
+    :py:class:`CachedFeatureExtractor`
+
+    """
+    path = None
+    maxentries = 100000
+    readonly = False
+    pending = []
+    _tables = {}
+
+    def __init__(self, path, maxentries=100000):
+        self.path = path
+        self.maxentries = maxentries
+        self.readonly = False
+        self.pending = []
+        self._tables = {}
+        if not os.path.exists(path):
+            os.makedirs(path)
+        _openStores.add(self)
+
+    def _table(self, key, width):
+        table = self._tables.get(key)
+        if table is None:
+            table = _FeatureTable(os.path.join(self.path, key), width, self.maxentries, self.readonly)
+            self._tables[key] = table
+        return table
+
+    def get(self, key, width, digest):
+        """
+        The vector of an image, by its content digest, from the table of an
+        extractor configuration, or None.
+        """
+        return self._table(key, width).get(digest)
+
+    def put(self, key, width, digest, vector):
+        if self.readonly:
+            self.pending.append((key, width, digest, list(vector)))
+            return
+        self._table(key, width).put(digest, vector)
+
+    def flush(self):
+        """
+        Write the index of every table to disk. This is done when the
+        program exits, call it to make the vectors visible to other
+        processes sooner.
+        """
+        for table in self._tables.values():
+            table.flush()
+
+    def __getstate__(self):
+        mydict = self.__dict__.copy()
+        mydict['_tables'] = {}
+        mydict['readonly'] = True
+        mydict['pending'] = []
+        return mydict
+
+
+#every writable store, flushed once when the program exits
+_openStores = weakref.WeakSet()
+
+def _flushStores():
+    for store in list(_openStores):
+        store.flush()
+
+atexit.register(_flushStores)
+
+
+class _FeatureTable(object):
+    """
+    One table of a FeatureStore: a memory mapped rows x width float64 array
+    in name.dat and an index from image digest to row in name.idx. The index
+    is kept in least recently used order.
+    """
+    def __init__(self, name, width, maxentries, readonly=False):
+        self.name = name
+        self.width = width
+        self.maxentries = maxentries
+        self.readonly = readonly
+        self.rows = OrderedDict()
+        self.free = []
+        self.capacity = 0
+        self.data = None
+        self.dirty = False
+        try:
+            f = open(name + ".idx", 'rb')
+            try:
+                (width, rows) = pickle.load(f)
+            finally:
+                f.close()
+            if width == self.width:
+                self.rows = rows
+        except Exception:
+            pass
+        used = max(self.rows.values()) + 1 if self.rows else 0
+        if self.readonly:
+            self._map(used)
+            return
+        self._grow(used)
+        #rows of entries evicted since the index was written
+        taken = set(self.rows.values())
+        self.free = [r for r in range(used) if r not in taken]
+        while len(self.rows) > self.maxentries:
+            self.free.append(self.rows.popitem(last=False)[1])
+
+    def _grow(self, capacity):
+        """
+        Make room for capacity rows, growing the file by doubling so the map
+        doesn't have to be rebuilt for every new row.
+        """
+        if capacity <= self.capacity and self.data is not None:
+            return
+        capacity = max(capacity, min(max(2 * self.capacity, 64), self.maxentries))
+        nbytes = capacity * self.width * 8
+        f = open(self.name + ".dat", 'ab')
+        try:
+            if os.path.getsize(self.name + ".dat") < nbytes:
+                f.truncate(nbytes)
+        finally:
+            f.close()
+        self.data = np.memmap(self.name + ".dat", dtype=np.float64, mode='r+',
+                              shape=(capacity, self.width))
+        self.capacity = capacity
+
+    def _map(self, rows):
+        """
+        Map the rows that are in the file, read only, for a table that isn't
+        written. Rows the file doesn't have yet are dropped from the index.
+        """
+        try:
+            capacity = min(rows, os.path.getsize(self.name + ".dat") // (self.width * 8))
+        except OSError:
+            capacity = 0
+        self.rows = OrderedDict([(d, r) for (d, r) in self.rows.items() if r < capacity])
+        if capacity > 0:
+            self.data = np.memmap(self.name + ".dat", dtype=np.float64, mode='r',
+                                  shape=(capacity, self.width))
+        self.capacity = capacity
+
+    def get(self, digest):
+        #a hit only changes the order in memory, the index isn't rewritten for it
+        row = self.rows.pop(digest, None)
+        if row is None:
+            return None
+        self.rows[digest] = row
+        return self.data[row].tolist()
+
+    def put(self, digest, vector):
+        row = self.rows.pop(digest, None)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            elif len(self.rows) < self.maxentries:
+                row = len(self.rows)
+                self._grow(row + 1)
+            else:
+                row = self.rows.popitem(last=False)[1]
+        self.data[row] = vector
+        self.rows[digest] = row
+        self.dirty = True
+
+    def flush(self):
+        if self.readonly or not self.dirty:
+            return
+        self.data.flush()
+        tmp = self.name + ".idx." + str(os.getpid())
+        f = open(tmp, 'wb')
+        pickle.dump((self.width, self.rows), f, 2)
+        f.close()
+        os.rename(tmp, self.name + ".idx")
+        self.dirty = False
+
+
+class CachedFeatureExtractor(FeatureExtractorBase):
+    """
+    **SUMMARY**
+
+    Wrap a feature extractor so the feature vector of an image is only
+    computed once. Vectors are kept in a FeatureStore, keyed by a hash of the
+    image pixels and of the extractor's class and settings, so a sweep that
+    runs the same extractors over the same images many times only pays for
+    the first run. It works with any extractor, including the
+    HueHistogram, EdgeHistogram, Morphology, HaarLike and BOF extractors,
+    and can be used wherever the wrapped extractor is.
+
+    The settings of the extractor are read when it is wrapped, wrap it again
+    after changing them (e.g. after loading a new BOF codebook).
+
+    **PARAMETERS**
+
+    * *extractor* - the feature extractor to wrap.
+    * *store* - a FeatureStore, or a directory to make one in.
+
+    **EXAMPLE**
+
+    >>> haar = CachedFeatureExtractor(HaarLikeFeatureExtractor(fname="haar.txt"), "./features/")
+    >>> for params in sweep:
+    >>>     svm = SVMClassifier([haar], params)
+    >>>     svm.train(paths, classes)
+
+    **SEE ALSO**
+
+    :py:class:`FeatureStore`
+
+    """
+    mExtractor = None
+    mStore = None
+    mKey = None
+
+    def __init__(self, extractor, store):
+        if isinstance(store, basestring):
+            store = FeatureStore(store)
+        self.mExtractor = extractor
+        self.mStore = store
+        self.mKey = _extractorKey(extractor)
+
+    def extract(self, img):
+        """
+        The feature vector of the wrapped extractor, from the store when the
+        same image has been seen before.
+        """
+        digest = _imageDigest(img)
+        retVal = self.mStore.get(self.mKey, self.getNumFields(), digest)
+        if retVal is None:
+            retVal = self.mExtractor.extract(img)
+            if retVal is not None:
+                retVal = list(retVal)
+                if len(retVal) == self.getNumFields():
+                    self.mStore.put(self.mKey, self.getNumFields(), digest, retVal)
+        return retVal
+
+    def extractBatch(self, imgs):
+        """
+        Extract the feature vectors of a list of images, using the wrapped
+        extractor's extractBatch for the images that are not in the store
+        if it has one. Returns an (images x fields) array, with a row of NaN
+        for images the extractor failed on.
+        """
+        width = self.getNumFields()
+        retVal = np.zeros((len(imgs), width), dtype=np.float64)
+        digests = [_imageDigest(img) for img in imgs]
+        missing = []
+        for i in range(len(imgs)):
+            vector = self.mStore.get(self.mKey, width, digests[i])
+            if vector is None:
+                missing.append(i)
+            else:
+                retVal[i] = vector
+        if not missing:
+            return retVal
+        if hasattr(self.mExtractor, "extractBatch"):
+            vectors = self.mExtractor.extractBatch([imgs[i] for i in missing])
+        else:
+            vectors = [self.mExtractor.extract(imgs[i]) for i in missing]
+        for i, vector in zip(missing, vectors):
+            if vector is None:
+                retVal[i] = np.nan
+                continue
+            retVal[i] = vector
+            self.mStore.put(self.mKey, width, digests[i], list(vector))
+        return retVal
+
+    def getFieldNames(self):
+        """
+        The field names of the wrapped extractor.
+        """
+        return self.mExtractor.getFieldNames()
+
+    def getNumFields(self):
+        """
+        The number of fields of the wrapped extractor.
+        """
+        return self.mExtractor.getNumFields()
+
+
+def _extractorKey(extractor):
+    """
+    A name for the configuration of an extractor: its class and a hash of
+    the settings _extractorConfig() describes it by.
+    """
+    config = _extractorConfig(extractor)
+    return extractor.__class__.__name__ + "-" + hashlib.md5(repr(config)).hexdigest()
+
+
+def _imageDigest(img):
+    """
+    A hash of the size and pixels of an image.
+    """
+    bitmap = img.getBitmap()
+    digest = hashlib.sha1(str((img.width, img.height, bitmap.nChannels, bitmap.depth)))
+    digest.update(bitmap.tostring())
+    return digest.hexdigest()
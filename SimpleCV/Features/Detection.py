@@ -913,6 +913,8 @@ class TemplateMatch(Feature):
     quality = 0
     w = 0
     h = 0
+    template_index = 0 # which template of a TemplateBank matched
+    scale = 1.0 # the scale the template matched at
 
     def __init__(self, image, template, location, quality):
         self.template_image = template # -- KAT - TRYING SOMETHING
@@ -995,6 +997,52 @@ class TemplateMatch(Feature):
         Nothing - this is an inplace operation that modifies the source images drawing layer.
         """
         self.image.dl().rectangle((self.x,self.y), (self.width(), self.height()), color = color, width=width)
+
+def _templatePeaks(result, w, h, threshold, check):
+    """
+    Find the candidate matches in a MatchTemplate result. A location is a
+    candidate if its score passes threshold standard deviations from the mean
+    (below it when check > 0, above otherwise) and it is the best score in the
+    template sized window around it. Returns arrays of x, y and score.
+    """
+    result = np.asarray(result, dtype=np.float32)
+    mean = np.mean(result)
+    sd = np.std(result)
+    if check > 0:
+        good = -result
+        candidates = result < mean - threshold * sd
+    else:
+        good = result
+        candidates = result > mean + threshold * sd
+    peaks = candidates & (good == ndimage.maximum_filter(good, size=(h, w), mode='nearest'))
+    ys, xs = np.nonzero(peaks)
+    return (xs, ys, result[ys, xs])
+
+
+def _suppressOverlaps(boxes, scores, check):
+    """
+    Greedy non-maximum suppression. boxes is an (n,4) array of x,y,w,h.
+    Keeps the best scoring box (lowest when check > 0), drops every box that
+    overlaps it and repeats. Returns the indices of the kept boxes, best first.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    order = np.argsort(scores, kind='mergesort')
+    if check <= 0:
+        order = order[::-1]
+    x0 = boxes[:, 0]
+    y0 = boxes[:, 1]
+    x1 = x0 + boxes[:, 2]
+    y1 = y0 + boxes[:, 3]
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        overlaps = ((np.minimum(x1[i], x1[rest]) > np.maximum(x0[i], x0[rest])) &
+                    (np.minimum(y1[i], y1[rest]) > np.maximum(y0[i], y0[rest])))
+        order = rest[~overlaps]
+    return np.array(keep, dtype=np.int64)
+
 ######################################################################
 class Circle(Feature):
     """
@@ -49,3 +49,34 @@ class FeatureExtractorBase(object):
         """
         This method returns the total number of fields in the feature vector.
         """
+
+
+#the settings that change the output of the stock feature extractors
+_configAttributes = ['mNBins', 'mDo45', 'mPatchSize', 'mNumCodes', 'mPadding',
+                     'mLayout', 'mThresholdOpeation', 'mThresholdOperation']
+
+def _extractorConfig(extractor):
+    """
+    A tuple describing what an extractor computes, to key cached feature
+    vectors by: its class, its field names and the settings listed in
+    _configAttributes, with the BOF codebook as a hash of its values and
+    threshold operations by name. Runtime state like blob makers or corner
+    tables is left out, so it doesn't change from one use to the next. A
+    wrapping extractor, e.g. a CachedFeatureExtractor, is described by the
+    extractor it wraps.
+    """
+    wrapped = getattr(extractor, 'mExtractor', None)
+    if wrapped is not None:
+        return _extractorConfig(wrapped)
+    config = [extractor.__class__.__name__, tuple(extractor.getFieldNames())]
+    for name in _configAttributes:
+        if not hasattr(extractor, name):
+            continue
+        value = getattr(extractor, name)
+        if callable(value):
+            value = getattr(value, '__module__', None), getattr(value, '__name__', repr(value))
+        config.append((name, value))
+    codebook = getattr(extractor, 'mCodebook', None)
+    if codebook is not None:
+        config.append(('mCodebook', hashlib.md5(np.ascontiguousarray(codebook).tostring()).hexdigest()))
+    return tuple(config)
@@ -16,6 +16,8 @@ class HaarLikeFeatureExtractor(FeatureExtractorBase):
 
     mFeatureSet = None
     mDo45 = True
+    _mRegionTable = None # the regions of every feature as unit coordinate arrays
+    _mCornerTables = None # integral image shape -> (corner indices, weights)
     def __init__(self, fname=None, do45=True):
         """
         fname - The feature file name
@@ -26,6 +28,8 @@ class HaarLikeFeatureExtractor(FeatureExtractorBase):
         #to get our haar wavelet
         self.mDo45 = True
         self.mFeatureset=None;
+        self._mRegionTable = None
+        self._mCornerTables = {}
         if(fname is not None):
             self.readWavelets(fname)
 
@@ -62,8 +66,55 @@ class HaarLikeFeatureExtractor(FeatureExtractorBase):
 
             feat = HaarLikeFeature(name,region)
             self.mFeatureSet.append(feat)
+        self._mRegionTable = None
+        self._mCornerTables = {}
         return None
 
+    def _compile(self):
+        """
+        Flatten the regions of all the features into arrays, (owner, p, q, r, s, sign)
+        where owner is the index of the feature a region belongs to.
+        """
+        owner = []
+        regions = []
+        for i in range(len(self.mFeatureSet)):
+            for region in self.mFeatureSet[i].mRegions:
+                owner.append(i)
+                regions.append(region[0:5])
+        regions = np.array(regions, dtype=np.float64).reshape(-1, 5)
+        self._mRegionTable = (np.array(owner, dtype=np.int64),) + tuple(regions.T)
+        self._mCornerTables = {}
+
+    def _cornerTable(self, shape):
+        """
+        For integral images of the given shape, return the flat indices of the
+        corners of every region and a (corners x features) weight matrix, so
+        that the feature vector is integral.flat[indices].dot(weights). The
+        corners are the same ones HaarLikeFeature.apply() reads.
+        """
+        if self._mCornerTables is None:
+            self._mCornerTables = {}
+        if shape in self._mCornerTables:
+            return self._mCornerTables[shape]
+        if self._mRegionTable is None:
+            self._compile()
+        (owner, p, q, r, s, sign) = self._mRegionTable
+        w = shape[0]-1
+        h = shape[1]-1
+        left = (w*p).astype(np.int64)
+        right = (w*r).astype(np.int64)
+        top = (h*q).astype(np.int64)
+        bottom = (h*s).astype(np.int64)
+        stride = shape[1]
+        # sum = A - B - C + D, see HaarLikeFeature.apply()
+        indices = np.concatenate((right*stride+bottom, right*stride+top,
+                                  left*stride+bottom, left*stride+top))
+        coeffs = np.concatenate((sign, -sign, -sign, sign))
+        weights = np.zeros((len(indices), len(self.mFeatureSet)), dtype=np.float64)
+        weights[np.arange(len(indices)), np.tile(owner, 4)] = coeffs
+        self._mCornerTables[shape] = (indices, weights)
+        return (indices, weights)
+
     def saveWavelets(self, fname):
         """
         Save wavelets to file
@@ -80,17 +131,38 @@ class HaarLikeFeatureExtractor(FeatureExtractorBase):
         This extractor takes in an image, creates the integral image, applies
         the Haar cascades, and returns the result as a feature vector.
         """
-        regular = img.integralImage()
-        retVal = []
+        return list(self.extractBatch([img])[0])
 
-        for i in range(len(self.mFeatureSet)):
-            retVal.append(self.mFeatureSet[i].apply(regular))
+    def extractBatch(self, imgs):
+        """
+        Extract the feature vectors of a list of images at once. The images
+        are grouped by size, and the integral images of each group are stacked
+        so all their features come from one matrix product. Returns an
+        (images x fields) array, the rows in the same order as imgs.
+        """
+        nfeats = len(self.mFeatureSet)
+        retVal = np.zeros((len(imgs), nfeats), dtype=np.float64)
+        groups = {}
+        for i in range(len(imgs)):
+            regular = imgs[i].integralImage()
+            groups.setdefault(regular.shape, []).append((i, regular))
+        for shape, members in groups.items():
+            (indices, weights) = self._cornerTable(shape)
+            stacked = np.array([m[1].ravel() for m in members])
+            retVal[[m[0] for m in members]] = stacked[:, indices].astype(np.float64).dot(weights)
         if(self.mDo45):
-            slant = img.integralImage(tilted=True)
-            for i in range(len(self.mFeatureSet)):
-                retVal.append(self.mFeatureSet[i].apply(regular))
+            #the angled features have always been computed on the regular
+            #integral image, so the trained classifiers expect a copy here
+            retVal = np.hstack((retVal, retVal))
         return retVal
 
+    def __getstate__(self):
+        mydict = self.__dict__.copy()
+        #both tables are rebuilt on first use, so using an extractor doesn't change its pickle
+        mydict['_mRegionTable'] = None
+        mydict['_mCornerTables'] = {}
+        return mydict
+
     def getFieldNames(self):
         """
         This method gives the names of each field in the feature vector in the
@@ -0,0 +1,241 @@
+from SimpleCV.base import *
+from SimpleCV.Features.Features import FeatureSet
+from SimpleCV.Features.Detection import KeypointMatch
+
+class KeypointIndex(object):
+    """
+    **SUMMARY**
+
+    A KeypointIndex holds the keypoint descriptors of a library of template
+    images in a single FLANN index, so a frame can be matched against every
+    template with one nearest neighbour search instead of building an index
+    per template and per call. The index can be saved to a directory and
+    loaded back with the descriptors memory mapped.
+
+    **PARAMETERS**
+
+    * *templates* - a list of template Images.
+    * *quality* - the keypoint quality threshold, see :py:meth:`findKeypointMatch`.
+    * *flavor* - the keypoint detector, see :py:meth:`findKeypoints`.
+    * *highQuality* - use the 128 value SURF descriptors.
+
+    **EXAMPLE**
+
+    >>> index = KeypointIndex([Image(f) for f in glob.glob("logos/*.png")])
+    >>> index.save("logos.index")
+    >>> index = KeypointIndex.load("logos.index")
+    >>> cam = Camera()
+    >>> while True:
+    >>>     img = cam.getImage()
+    >>>     for match in img.findKeypointMatch(index) or []:
+    >>>         print match.template_index, match.count
+    >>>         match.draw()
+    >>>     img.show()
+
+    **SEE ALSO**
+
+    :py:meth:`findKeypointMatch`
+
+    """
+    quality = 500.00
+    flavor = "SURF"
+    highQuality = 1
+    templates = [] # the template Images, None for templates loaded from disk
+    sizes = [] # (width, height) of each template
+    descriptors = None # every descriptor of every template, one per row
+    points = None # the (x,y) position of each descriptor's keypoint on its template
+    owners = None # the template each descriptor belongs to
+    counts = None # the number of descriptors of each template
+    _flann = None
+
+    def __init__(self, templates=None, quality=500.00, flavor="SURF", highQuality=1):
+        self.quality = quality
+        self.flavor = flavor
+        self.highQuality = highQuality
+        self.templates = []
+        self.sizes = []
+        self.descriptors = None
+        self.points = np.zeros((0, 2), dtype=np.float32)
+        self.owners = np.zeros(0, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.int32)
+        self._flann = None
+        for template in (templates or []):
+            self.add(template)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def add(self, template):
+        """
+        **SUMMARY**
+
+        Find the keypoints of a template and add them to the index.
+
+        **RETURNS**
+
+        The index of the template, as found in the template_index of its
+        matches, or None if the template has no keypoints.
+        """
+        kp, d = template._getRawKeypoints(self.quality, self.flavor, self.highQuality)
+        if( kp is None or d is None or len(kp) == 0 ):
+            warnings.warn("KeypointIndex: the template has no keypoints. Image might be too uniform or blurry.")
+            return None
+        index = len(self.sizes)
+        d = np.asarray(d, dtype=np.float32)
+        if( self.descriptors is None ):
+            self.descriptors = d
+        else:
+            self.descriptors = np.vstack((self.descriptors, d))
+        self.points = np.vstack((self.points, np.array([k.pt for k in kp], dtype=np.float32)))
+        self.owners = np.concatenate((self.owners, np.ones(len(d), dtype=np.int32) * index))
+        self.counts = np.concatenate((self.counts, [len(d)])).astype(np.int32)
+        self.templates.append(template)
+        self.sizes.append((template.width, template.height))
+        self._flann = None
+        return index
+
+    def _index(self):
+        if( self._flann is None ):
+            import cv2
+            FLANN_INDEX_KDTREE = 1  # bug: flann enums are missing
+            self._flann = cv2.flann_Index(self.descriptors, dict(algorithm = FLANN_INDEX_KDTREE, trees = 4))
+        return self._flann
+
+    def query(self, img, minDist=0.2, minMatch=16):
+        """
+        **SUMMARY**
+
+        Match the keypoints of an image against every template. Each
+        keypoint of the image is matched to its nearest template descriptor,
+        and the match counts if its distance is under minDist, scaled as in
+        findKeypointMatch(). Templates with at least minMatch matches get a
+        homography from template to image coordinates. A minMatch below 1 is
+        the fraction of a template's keypoints that must match, as in
+        findKeypointMatch(), but never less than 16 matches. A homography
+        always takes at least 4 matches.
+
+        **RETURNS**
+
+        An array with the number of matches of each template, and a list
+        with the 3x3 homography of each template, or None.
+        """
+        counts = np.zeros(len(self), dtype=np.int32)
+        homographies = [None] * len(self)
+        if( self.descriptors is None ):
+            return counts, homographies
+        skp, sd = img._getRawKeypoints(self.quality, self.flavor, self.highQuality)
+        if( skp is None or sd is None or len(skp) == 0 ):
+            return counts, homographies
+        import cv2
+        idx, dist = self._index().knnSearch(np.asarray(sd, dtype=np.float32), 1, params = {}) # bug: need to provide empty dict
+        idx = idx[:, 0]
+        owner = self.owners[idx]
+        #the same allowance findKeypointMatch makes for images with more keypoints than the template
+        magic_ratio = np.maximum(float(len(sd)) / self.counts[owner], 1.0)
+        good = dist[:, 0] * magic_ratio < minDist
+        counts = np.bincount(owner[good], minlength=len(self)).astype(np.int32)
+        framePoints = np.array([k.pt for k in skp], dtype=np.float32)
+        if( minMatch < 1 ):
+            minMatch = np.maximum(np.ceil(minMatch * self.counts), 16)
+        #findHomography needs at least 4 point pairs
+        minMatch = np.maximum(minMatch, 4)
+        for t in np.nonzero(counts >= minMatch)[0]:
+            mine = good & (owner == t)
+            (homography, mask) = cv2.findHomography(self.points[idx[mine]], framePoints[mine], cv2.RANSAC, ransacReprojThreshold=1.0)
+            homographies[t] = homography
+        return counts, homographies
+
+    def match(self, img, minDist=0.2, minMatch=16):
+        """
+        **SUMMARY**
+
+        Find the templates of the index in an image, see query() for
+        minDist and minMatch.
+
+        **RETURNS**
+
+        A FeatureSet with a KeypointMatch for every template found, with
+        template_index and count (the number of matching keypoints) set. The
+        template Image of a match is None if the index was loaded with
+        load(), use template_index to find it.
+        """
+        import cv2
+        counts, homographies = self.query(img, minDist, minMatch)
+        fs = FeatureSet()
+        for t in range(len(self)):
+            if( homographies[t] is None ):
+                continue
+            (w, h) = self.sizes[t]
+            pts = np.array([[0,0],[0,h],[w,h],[w,0]], dtype="float32")
+            pPts = cv2.perspectiveTransform(np.array([pts]), homographies[t])
+            corners = [(p[0], p[1]) for p in pPts[0]]
+            match = KeypointMatch(img, self.templates[t], corners, homographies[t])
+            match.template_index = t
+            match.count = int(counts[t])
+            fs.append(match)
+        return fs
+
+    def save(self, path):
+        """
+        **SUMMARY**
+
+        Save the index to a directory, which is created if needed. The
+        template images themselves are not saved.
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        if( self.descriptors is not None ):
+            np.save(os.path.join(path, "descriptors.npy"), self.descriptors)
+        np.save(os.path.join(path, "points.npy"), self.points)
+        np.save(os.path.join(path, "owners.npy"), self.owners)
+        meta = {"quality" : self.quality, "flavor" : self.flavor,
+                "highQuality" : self.highQuality, "sizes" : self.sizes}
+        f = open(os.path.join(path, "meta.pkl"), 'wb')
+        pickle.dump(meta, f, 2)
+        f.close()
+        if( self.descriptors is not None ):
+            self._index().save(os.path.join(path, "flann.idx"))
+
+    def load(cls, path, mmap=True):
+        """
+        **SUMMARY**
+
+        Load an index saved with save(). With mmap the descriptors are memory
+        mapped rather than read, so several processes can share one copy.
+        The template images are not saved, so the templates of a loaded
+        index, and of the KeypointMatches it finds, are None.
+
+        **RETURNS**
+
+        A KeypointIndex.
+        """
+        f = open(os.path.join(path, "meta.pkl"), 'rb')
+        meta = pickle.load(f)
+        f.close()
+        retVal = cls(quality=meta["quality"], flavor=meta["flavor"], highQuality=meta["highQuality"])
+        mode = 'r' if mmap else None
+        fname = os.path.join(path, "descriptors.npy")
+        if( os.path.exists(fname) ): # not there for an empty index
+            retVal.descriptors = np.load(fname, mmap_mode=mode)
+        retVal.points = np.load(os.path.join(path, "points.npy"), mmap_mode=mode)
+        retVal.owners = np.load(os.path.join(path, "owners.npy"), mmap_mode=mode)
+        retVal.sizes = list(meta["sizes"])
+        retVal.templates = [None] * len(retVal.sizes)
+        retVal.counts = np.bincount(retVal.owners, minlength=len(retVal.sizes)).astype(np.int32)
+        fname = os.path.join(path, "flann.idx")
+        if( retVal.descriptors is not None and os.path.exists(fname) ):
+            try:
+                import cv2
+                flann = cv2.flann_Index()
+                if flann.load(retVal.descriptors, fname):
+                    retVal._flann = flann
+            except Exception:
+                #rebuilt from the descriptors on the first query
+                retVal._flann = None
+        return retVal
+    load = classmethod(load)
+
+    def __getstate__(self):
+        mydict = self.__dict__.copy()
+        mydict['_flann'] = None
+        return mydict
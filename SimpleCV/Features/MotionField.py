@@ -0,0 +1,283 @@
+from SimpleCV.base import *
+from SimpleCV.Color import Color
+from SimpleCV.Features.Features import FeatureSet
+from SimpleCV.Features.Detection import Motion
+
+class MotionField(object):
+    """
+    **SUMMARY**
+
+    A MotionField holds the result of an optical flow calculation as NumPy
+    arrays over the sample grid, rather than as one Motion feature per
+    sample. All the arrays have one row per grid row and one column per
+    grid column:
+
+    * *x*, *y* - the sample positions on the image.
+    * *dx*, *dy* - the flow vector at each sample.
+    * *norm_dx*, *norm_dy* - the flow vectors scaled so the longest has length 1.
+
+    Motion features are only made when you ask for them with toFeatureSet().
+
+    **EXAMPLE**
+
+    >>> cam = Camera()
+    >>> img1 = cam.getImage()
+    >>> img2 = cam.getImage()
+    >>> field = img2.findMotion(img1, dense=True)
+    >>> moving = field.magnitude() > 2.0
+    >>> print field.x[moving], field.y[moving]
+
+    **SEE ALSO**
+
+    :py:class:`FlowEngine`
+    :py:class:`Motion`
+
+    """
+    image = None
+    window = 11
+    x = None
+    y = None
+    dx = None
+    dy = None
+    norm_dx = None
+    norm_dy = None
+
+    def __init__(self, image, x, y, dx, dy, window):
+        self.image = image
+        self.window = window
+        self.x = x
+        self.y = y
+        self.dx = dx
+        self.dy = dy
+        max_mag = self.maxMagnitude()
+        if( max_mag == 0 ):
+            self.norm_dx = np.zeros(dx.shape)
+            self.norm_dy = np.zeros(dy.shape)
+        else:
+            self.norm_dx = dx / max_mag
+            self.norm_dy = dy / max_mag
+
+    def __len__(self):
+        return self.dx.size
+
+    def magnitude(self):
+        """
+        The length of the flow vector at each sample.
+        """
+        return np.sqrt((self.dx*self.dx)+(self.dy*self.dy))
+
+    def maxMagnitude(self):
+        """
+        The length of the longest flow vector, used to normalize the vectors.
+        """
+        if( self.dx.size == 0 ):
+            return 0.0
+        return float(np.sqrt(np.max((self.dx*self.dx)+(self.dy*self.dy))))
+
+    def toFeatureSet(self):
+        """
+        **SUMMARY**
+
+        Make the Motion features of the field, in the order findMotion() has
+        always returned them: down each column of the grid, left to right.
+
+        **RETURNS**
+
+        A FeatureSet of Motion features.
+        """
+        fs = FeatureSet()
+        columns = [a.T.ravel() for a in (self.x, self.y, self.dx, self.dy, self.norm_dx, self.norm_dy)]
+        for (x, y, dx, dy, ndx, ndy) in zip(*columns):
+            m = Motion(self.image, x, y, float(dx), float(dy), self.window)
+            m.norm_dx = ndx
+            m.norm_dy = ndy
+            fs.append(m)
+        return fs
+
+    def draw(self, color=Color.GREEN, width=1, normalize=True):
+        """
+        **SUMMARY**
+
+        Draw every flow vector on the image's drawing layer, like Motion.draw().
+        """
+        if( normalize ):
+            win = self.window/2
+            w = math.sqrt((win*win)*2)
+            ex = (self.norm_dx*w) + self.x
+            ey = (self.norm_dy*w) + self.y
+        else:
+            ex = self.x + self.dx
+            ey = self.y + self.dy
+        layer = self.image.dl()
+        for (x, y, nx, ny) in zip(self.x.ravel(), self.y.ravel(), ex.ravel(), ey.ravel()):
+            layer.line((x,y),(nx,ny),color,width)
+
+
+class FlowEngine(object):
+    """
+    **SUMMARY**
+
+    A FlowEngine computes the optical flow of a stream of frames. It keeps
+    the last frame and the OpenCV result buffers between calls, so nothing
+    is allocated per frame once the first frame has been seen.
+
+    **PARAMETERS**
+
+    * *method* - 'BM', 'LK' or 'HS', see :py:meth:`findMotion`.
+    * *window* - the block size, see :py:meth:`findMotion`.
+    * *aggregate* - average the flow over each grid cell, see :py:meth:`findMotion`.
+
+    **EXAMPLE**
+
+    >>> cam = Camera()
+    >>> flow = FlowEngine(method="LK", window=9)
+    >>> while True:
+    >>>     img = cam.getImage()
+    >>>     field = flow.update(img)
+    >>>     if field is not None:
+    >>>         field.draw()
+    >>>     img.show()
+
+    **SEE ALSO**
+
+    :py:class:`MotionField`
+    :py:meth:`findMotion`
+
+    """
+    method = "BM"
+    window = 11
+    aggregate = True
+    _previous = None
+    _buffers = {}
+
+    def __init__(self, method="BM", window=11, aggregate=True):
+        self.method = method
+        self.aggregate = aggregate
+        self._version = _flowVersion()
+        if( self._version == 1 and window > 9 ):
+            window = 9
+        self.window = window
+        self._previous = None
+        self._buffers = {}
+
+    def reset(self):
+        """
+        Forget the last frame, e.g. after a cut in the stream.
+        """
+        self._previous = None
+
+    def update(self, img):
+        """
+        **SUMMARY**
+
+        Find the motion between the last frame given to update() and img.
+
+        **RETURNS**
+
+        A MotionField, or None for the first frame.
+        """
+        previous = self._previous
+        self._previous = img
+        if( previous is None ):
+            return None
+        return self.compute(img, previous)
+
+    def _buffer(self, key, make):
+        buffers = self._buffers.get(key)
+        if( buffers is None ):
+            buffers = (make(), make())
+            self._buffers[key] = buffers
+        return buffers
+
+    def compute(self, img, previous_frame):
+        """
+        **SUMMARY**
+
+        Find the motion between two frames of the same size.
+
+        **RETURNS**
+
+        A MotionField, or None if the frames don't match or the method is unknown.
+        """
+        if( img.width != previous_frame.width or img.height != previous_frame.height):
+            logger.warning("ImageClass.getMotion: To find motion the current and previous frames must match")
+            return None
+        window = self.window
+        method = self.method
+
+        if( method == "LK" or method == "HS" ):
+            (xf, yf) = self._buffer((method, img.width, img.height),
+                                    lambda: cv.CreateImage((img.width, img.height), cv.IPL_DEPTH_32F, 1))
+            win = (window,window)
+            if( method == "LK" ):
+                cv.CalcOpticalFlowLK(img._getGrayscaleBitmap(),previous_frame._getGrayscaleBitmap(),win,xf,yf)
+            else:
+                cv.CalcOpticalFlowHS(previous_frame._getGrayscaleBitmap(),img._getGrayscaleBitmap(),0,xf,yf,1.0,(cv.CV_TERMCRIT_ITER | cv.CV_TERMCRIT_EPS, 10, 0.01))
+            xa = np.asarray(cv.GetMat(xf))
+            ya = np.asarray(cv.GetMat(yf))
+
+            w = math.floor((float(window))/2.0)
+            cx = int(((img.width-window)/window)+1) #our sample rate
+            cy = int(((img.height-window)/window)+1)
+            (x, y) = np.meshgrid(np.arange(cx)*window + w, np.arange(cy)*window + w)
+            if( self.aggregate ):
+                #average the (2w x 2w) block at the top left of each cell
+                n = int(2*w)
+                dx = _blockMean(xa, cx, cy, window, n)
+                dy = _blockMean(ya, cx, cy, window, n)
+            else: # other wise just sample
+                dx = xa[y.astype(int), x.astype(int)].astype(np.float64)
+                dy = ya[y.astype(int), x.astype(int)].astype(np.float64)
+
+        elif( method == "BM"):
+            # In the interest of keep the parameter list short
+            # I am pegging these to the window size.
+            block = (window,window) # block size
+            if ( self._version == 0 ):
+                # For versions with OpenCV 2.4.0 and below.
+                shift = (int(window*1.2),int(window*1.2)) # how far to shift the block
+                spread = (window*2,window*2) # the search windows.
+                wv = (img.width - block[0]) / shift[0] # the result image size
+                hv = (img.height - block[1]) / shift[1]
+                (xf, yf) = self._buffer((method, wv, hv), lambda: cv.CreateMat(hv, wv, cv.CV_32FC1))
+            else:
+                #For versions with OpenCV 2.4.0 and above.
+                shift = (int(window*0.2),int(window*0.2)) # how far to shift the block
+                spread = (window,window) # the search windows.
+                wv = img.width-block[0]+shift[0]
+                hv = img.height-block[1]+shift[1]
+                (xf, yf) = self._buffer((method, wv, hv), lambda: cv.CreateImage((wv,hv), cv.IPL_DEPTH_32F, 1))
+            cv.CalcOpticalFlowBM(previous_frame._getGrayscaleBitmap(),img._getGrayscaleBitmap(),block,shift,spread,0,xf,yf)
+            (x, y) = np.meshgrid(np.arange(int(wv))*shift[0] + block[0], np.arange(int(hv))*shift[1] + block[1])
+            dx = np.asarray(cv.GetMat(xf)).astype(np.float64)
+            dy = np.asarray(cv.GetMat(yf)).astype(np.float64)
+        else:
+            logger.warning("ImageClass.findMotion: I don't know what algorithm you want to use. Valid method choices are Block Matching -> \"BM\" Horn-Schunck -> \"HS\" and Lucas-Kanade->\"LK\" ")
+            return None
+
+        return MotionField(img, x, y, dx, dy, window)
+
+
+def _blockMean(field, cx, cy, window, n):
+    """
+    The mean of the n x n block at the top left of every window x window cell
+    of the cx by cy grid of a flow field.
+    """
+    cells = field[:cy*window, :cx*window].reshape(cy, window, cx, window)[:, :n, :, :n]
+    return cells.astype(np.float64).mean(axis=3).mean(axis=1)
+
+
+def _flowVersion():
+    """
+    1 if OpenCV is 2.4.0 or newer, which changed CalcOpticalFlowBM, otherwise 0.
+    """
+    try:
+        import cv2
+        ver = cv2.__version__
+        #For OpenCV versions till 2.4.0,  cv2.__versions__ are of the form "$Rev: 4557 $"
+        if not ver.startswith('$Rev:') :
+            if int(ver.replace('.','0'))>=20400 :
+                return 1
+    except :
+        pass
+    return 0
@@ -0,0 +1,276 @@
+from SimpleCV.base import *
+from SimpleCV.Features.Features import FeatureSet
+from SimpleCV.Features.Detection import TemplateMatch, _templatePeaks, _suppressOverlaps
+
+# template matching methods, and whether the best score is the minimum (1) or maximum (0)
+_TEMPLATE_METHODS = {
+    "SQR_DIFF_NORM" : 1,
+    "SQR_DIFF" : 1,
+    "CCOEFF" : 0,
+    "CCOEFF_NORM" : 0,
+    "CCORR" : 0,
+    "CCORR_NORM" : 0
+}
+
+class TemplateBank(object):
+    """
+    **SUMMARY**
+
+    A TemplateBank holds a set of templates, each at a number of scales, ready
+    to be matched against many images. The templates are converted and
+    transformed once, when they are added. When matching, the image is
+    converted to gray and Fourier transformed once, and that transform is
+    shared by every template and scale. The scores are the same as those of
+    OpenCV's MatchTemplate for the same method.
+
+    **PARAMETERS**
+
+    * *templates* - a list of template Images.
+    * *scales* - the scales to match every template at, e.g. [0.8, 1.0, 1.25].
+    * *method* - the matching method, see :py:meth:`findTemplate`.
+    * *grayscale* - if False the BGR channels are matched instead of the gray image.
+    * *cachespectra* - keep the transform of every template and scale, padded to
+      the size of the last image matched, so frames of the same size don't
+      transform the templates again. Each takes about 4 bytes per image pixel
+      and channel, e.g. about 1GB for 40 templates at 3 scales on 1080p gray
+      frames, so turn it off for large banks.
+
+    **EXAMPLE**
+
+    >>> bank = TemplateBank([Image("bolt.png"), Image("nut.png")], scales=[0.9, 1.0, 1.1])
+    >>> cam = Camera()
+    >>> while True:
+    >>>     img = cam.getImage()
+    >>>     matches = img.findTemplate(bank)
+    >>>     for m in matches:
+    >>>         print m.template_index, m.scale, m.x, m.y
+
+    **SEE ALSO**
+
+    :py:meth:`findTemplate`
+    :py:meth:`findTemplateOnce`
+
+    """
+    templates = []
+    scales = [1.0]
+    method = "SQR_DIFF_NORM"
+    grayscale = True
+    cachespectra = True
+    _entries = [] # one dict per template and scale
+
+    def __init__(self, templates=None, scales=None, method="SQR_DIFF_NORM", grayscale=True, cachespectra=True):
+        if method is None or method == "":
+            method = "SQR_DIFF_NORM"
+        if method not in _TEMPLATE_METHODS:
+            logger.warning("ooops.. I don't know what template matching method you are looking for.")
+            method = "SQR_DIFF_NORM"
+        self.method = method
+        self.grayscale = grayscale
+        self.cachespectra = cachespectra
+        self.scales = list(scales) if scales else [1.0]
+        self.templates = []
+        self._entries = []
+        for template in (templates or []):
+            self.add(template)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def add(self, template):
+        """
+        **SUMMARY**
+
+        Add a template to the bank, at every scale of the bank.
+
+        **RETURNS**
+
+        The index of the template, as found in the template_index of its matches.
+        """
+        index = len(self.templates)
+        self.templates.append(template)
+        for scale in self.scales:
+            img = template
+            if scale != 1.0:
+                img = template.scale(float(scale))
+            planes = self._planes(img)
+            if self.method in ("CCOEFF", "CCOEFF_NORM"):
+                planes = [p - np.mean(p) for p in planes]
+            self._entries.append({
+                "index" : index,
+                "scale" : scale,
+                "image" : img,
+                "planes" : planes,
+                "sumsq" : sum([np.sum(p * p) for p in planes]),
+                "spectra" : None # (image size, FFTs of the zero padded template planes)
+            })
+        return index
+
+    def _planes(self, img):
+        if self.grayscale:
+            return [img.getGrayNumpyCv2().astype(np.float64)]
+        bgr = img.getNumpyCv2().astype(np.float64)
+        return [bgr[:, :, c] for c in range(3)]
+
+    def _prepare(self, img):
+        """
+        Everything about the searched image that the templates share: the FFT
+        of each plane and the integral images used for the window sums.
+        """
+        planes = self._planes(img)
+        prep = {"size" : planes[0].shape, "spectra" : [], "sums" : [], "sqsums" : []}
+        for p in planes:
+            prep["spectra"].append(np.fft.rfft2(p))
+            prep["sums"].append(_integral(p))
+            prep["sqsums"].append(_integral(p * p))
+        return prep
+
+    def _score(self, entry, prep):
+        """
+        The MatchTemplate result of one template and scale against the
+        prepared image, or None if the template doesn't fit.
+        """
+        (H, W) = prep["size"]
+        (h, w) = entry["planes"][0].shape
+        if h > H or w > W:
+            return None
+        if entry["spectra"] is not None and entry["spectra"][0] == (H, W):
+            spectra = entry["spectra"][1]
+        else:
+            #kept in single precision, and only for the last image size
+            spectra = [np.conj(np.fft.rfft2(p, s=(H, W))).astype(np.complex64) for p in entry["planes"]]
+            if self.cachespectra:
+                entry["spectra"] = ((H, W), spectra)
+        corr = 0
+        for F, T in zip(prep["spectra"], spectra):
+            corr = corr + np.fft.irfft2(F * T, s=(H, W))[:H-h+1, :W-w+1]
+
+        method = self.method
+        if method == "CCORR":
+            return corr
+        if method == "CCOEFF":
+            return corr
+        sqsum = sum([_windowSum(s, w, h) for s in prep["sqsums"]])
+        if method in ("SQR_DIFF", "SQR_DIFF_NORM"):
+            result = np.maximum(sqsum - 2 * corr + entry["sumsq"], 0)
+            if method == "SQR_DIFF":
+                return result
+            denom = np.sqrt(sqsum * entry["sumsq"])
+            return np.where(denom > 1e-6, result / np.maximum(denom, 1e-6), 1.0)
+        if method == "CCOEFF_NORM":
+            n = float(w * h)
+            var = sum([_windowSum(q, w, h) - _windowSum(s, w, h) ** 2 / n
+                       for s, q in zip(prep["sums"], prep["sqsums"])])
+            denom = np.sqrt(np.maximum(var, 0) * entry["sumsq"])
+        else:
+            denom = np.sqrt(sqsum * entry["sumsq"])
+        return np.where(denom > 1e-6, corr / np.maximum(denom, 1e-6), 0.0)
+
+    def _makeMatch(self, img, entry, x, y, quality):
+        match = TemplateMatch(img, entry["image"], (int(x), int(y)), quality)
+        match.template_index = entry["index"]
+        match.scale = entry["scale"]
+        return match
+
+    def match(self, img, threshold=5, rawmatches=False):
+        """
+        **SUMMARY**
+
+        Find every template of the bank in an image, like findTemplate() does
+        for a single template. Overlapping matches of the same template, at
+        any scale, are reduced to the best one.
+
+        **PARAMETERS**
+
+        * *img* - the Image to search.
+        * *threshold* - the number of standard deviations from the mean score a match must be.
+        * *rawmatches* - if True return every location past the threshold.
+
+        **RETURNS**
+
+        A FeatureSet of TemplateMatch features, with template_index and scale set.
+        """
+        check = _TEMPLATE_METHODS[self.method]
+        prep = self._prepare(img)
+        fs = FeatureSet()
+        for index in range(len(self.templates)):
+            candidates = []
+            for entry in self._entries:
+                if entry["index"] != index:
+                    continue
+                result = self._score(entry, prep)
+                if result is None:
+                    continue
+                (h, w) = entry["planes"][0].shape
+                if rawmatches:
+                    mean = np.mean(result)
+                    sd = np.std(result)
+                    if check > 0:
+                        ys, xs = np.nonzero(result < mean - threshold * sd)
+                    else:
+                        ys, xs = np.nonzero(result > mean + threshold * sd)
+                    for x, y in zip(xs, ys):
+                        fs.append(self._makeMatch(img, entry, x, y, result[y, x]))
+                    continue
+                (xs, ys, scores) = _templatePeaks(result, w, h, threshold, check)
+                for x, y, score in zip(xs, ys, scores):
+                    candidates.append((x, y, w, h, score, entry))
+            if not candidates:
+                continue
+            boxes = np.array([c[:4] for c in candidates])
+            scores = np.array([c[4] for c in candidates])
+            for i in _suppressOverlaps(boxes, scores, check):
+                (x, y, w, h, score, entry) = candidates[i]
+                fs.append(self._makeMatch(img, entry, x, y, score))
+        return fs
+
+    def matchOnce(self, img, threshold=0.2):
+        """
+        **SUMMARY**
+
+        Find the single best match of every template of the bank, like
+        findTemplateOnce() does for a single template. Templates whose best
+        score doesn't pass threshold are left out.
+
+        **RETURNS**
+
+        A FeatureSet of TemplateMatch features, with template_index and scale set.
+        """
+        check = _TEMPLATE_METHODS[self.method]
+        prep = self._prepare(img)
+        best = {}
+        for entry in self._entries:
+            result = self._score(entry, prep)
+            if result is None:
+                continue
+            if check > 0:
+                y, x = np.unravel_index(np.argmin(result), result.shape)
+                better = lambda a, b: a < b
+            else:
+                y, x = np.unravel_index(np.argmax(result), result.shape)
+                better = lambda a, b: a > b
+            score = result[y, x]
+            current = best.get(entry["index"])
+            if current is None or better(score, current[0]):
+                best[entry["index"]] = (score, x, y, entry)
+        fs = FeatureSet()
+        for index in sorted(best):
+            (score, x, y, entry) = best[index]
+            if (check > 0 and score <= threshold) or (check == 0 and score >= threshold):
+                fs.append(self._makeMatch(img, entry, x, y, score))
+        return fs
+
+
+def _integral(plane):
+    """
+    Integral image of a plane with a leading row and column of zeros.
+    """
+    retVal = np.zeros((plane.shape[0]+1, plane.shape[1]+1), dtype=np.float64)
+    retVal[1:, 1:] = np.cumsum(np.cumsum(plane, axis=0), axis=1)
+    return retVal
+
+
+def _windowSum(integral, w, h):
+    """
+    The sum over every w x h window, for the valid MatchTemplate positions.
+    """
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
@@ -1,8 +1,12 @@
 from SimpleCV.Features.HaarCascade import *
 from SimpleCV.Features.Features import *
 from SimpleCV.Features.Detection import *
+from SimpleCV.Features.MotionField import *
+from SimpleCV.Features.KeypointIndex import *
+from SimpleCV.Features.TemplateBank import *
 from SimpleCV.Features.BlobMaker import *
 from SimpleCV.Features.Blob import *
+from SimpleCV.Features.BlobTable import *
 from SimpleCV.Features.BOFFeatureExtractor import *
 from SimpleCV.Features.FeatureExtractorBase import *
 from SimpleCV.Features.HueHistogramFeatureExtractor import *
@@ -10,6 +14,7 @@ from SimpleCV.Features.MorphologyFeatureExtractor import *
 from SimpleCV.Features.EdgeHistogramFeatureExtractor import *
 from SimpleCV.Features.HaarLikeFeatureExtractor import *
 from SimpleCV.Features.HaarLikeFeature import *
+from SimpleCV.Features.CachedFeatureExtractor import *
 from SimpleCV.Features.PlayingCards import *
 from SimpleCV.Features.FeatureUtils import *
 from SimpleCV.Features.FaceRecognizer import *
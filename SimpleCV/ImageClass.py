@@ -73,6 +73,15 @@ class ImageSet(list):
     >>> imgs.filelist
     >>> logo = imgs.find('simplecv.png')
 
+    Large directories can be loaded lazily. Only the file paths and the image
+    sizes (read from the file headers) are kept, pixels are decoded when an
+    image is accessed and only the cacheSize most recently used images are
+    kept in memory:
+
+    >>> imgs = ImageSet('/path/to/lots/of/imgs/', lazy=True, cacheSize=32)
+    >>> imgs.dimensions()
+    >>> imgs[10].show()
+
     **TO DO**
 
     Eventually this should allow us to pull image urls / paths from csv files.
@@ -82,7 +91,17 @@ class ImageSet(list):
     """
 
     filelist = None
-    def __init__(self, directory = None):
+    lazy = False #if True the set holds file paths that are decoded on access
+    cacheSize = 0 #the number of decoded images a lazy set keeps in memory
+    _cache = None #LRU of decoded images, shared by slices of a lazy set
+    _headers = None #file path -> (width, height) read from the file header
+    _exif = None #file path -> EXIF data
+    _size = None #(width, height) that lazy images are resized to, see standardize()
+
+    def __init__(self, directory = None, lazy = False, cacheSize = 64):
+        if lazy:
+            self._makeLazy(cacheSize)
+
         if not directory:
             return
 
@@ -90,7 +109,10 @@ class ImageSet(list):
             if isinstance(directory[0], Image):
                 super(ImageSet,self).__init__(directory)
             elif isinstance(directory[0], str) or isinstance(directory[0], unicode):
-                super(ImageSet,self).__init__(map(Image, directory))
+                if self.lazy:
+                    self._addPaths(directory)
+                else:
+                    super(ImageSet,self).__init__(map(Image, directory))
 
         elif directory.lower() == 'samples' or directory.lower() == 'sample':
             pth = LAUNCH_PATH
@@ -539,7 +561,7 @@ class ImageSet(list):
 
         return loaded
 
-    def load(self, directory = None, extension = None, sort_by=None):
+    def load(self, directory = None, extension = None, sort_by=None, lazy=False, cacheSize=64, workers=1):
         """
         **SUMMARY**
 
@@ -547,6 +569,9 @@ class ImageSet(list):
         it.  If you give it an extension it will only load that extension
         otherwise it will try to load all know file types in that directory.
 
+        A lazy load only reads the size of every image from its file header.
+        The pixels are decoded when the image is first used.
+
         extension should be in the format:
         extension = 'png'
 
@@ -561,6 +586,10 @@ class ImageSet(list):
 
           The default behavior is to leave the directory unsorted.
 
+        * *lazy* - If True only store the file paths and decode the images on access.
+        * *cacheSize* - The number of decoded images a lazy set keeps in memory.
+        * *workers* - The number of threads used to decode the images.
+
         **RETURNS**
 
         The number of images in the image set.
@@ -570,8 +599,12 @@ class ImageSet(list):
         >>> imgs = ImageSet()
         >>> imgs.load("images/faces")
         >>> imgs.load("images/eyes", "png")
+        >>> imgs.load("images/training", lazy=True)
 
         """
+        if lazy:
+            self._makeLazy(cacheSize)
+
         if not directory:
             logger.warning("You need to give a directory to load files from.")
             return
@@ -609,10 +642,19 @@ class ImageSet(list):
 
         self.filelist = dict()
 
-        for i in file_set:
-            tmp = None
+        if self.lazy:
+            #the file list maps to paths, the images are not decoded yet
+            for i in self._addPaths(file_set):
+                self.filelist[os.path.basename(i)] = i
+            return len(self)
+
+        if workers > 1:
+            decoded = _prefetch(_tryLoadImage, [(i,) for i in file_set], 2*workers, workers)
+        else:
+            decoded = (_tryLoadImage(i) for i in file_set)
+
+        for tmp in decoded:
             try:
-                tmp = Image(i)
                 if( tmp is not None and tmp.width > 0 and tmp.height > 0):
                     if sys.platform.lower() == 'win32' or sys.platform.lower() == 'win64':
                         self.filelist[tmp.filename.split('\\')[-1]] = tmp
@@ -646,6 +688,14 @@ class ImageSet(list):
         >>>>   t.show()
 
         """
+        if self.lazy:
+            #the resize is done as each image is decoded
+            entries = [e if isinstance(e, basestring) else e.resize(width,height)
+                       for e in list.__iter__(self)]
+            retVal = self._lazyCopy(entries)
+            retVal._size = (width,height)
+            return retVal
+
         retVal = ImageSet()
         for i in self:
             retVal.append(i.resize(width,height))
@@ -672,16 +722,22 @@ class ImageSet(list):
 
         """
         retVal = []
+        if self.lazy:
+            for e in list.__iter__(self):
+                retVal.append(self._entrySize(e))
+            return np.array(retVal)
+
         for i in self:
             retVal.append((i.width,i.height))
         return np.array(retVal)
 
-    def average(self, mode="first", size=(None,None)):
+    def average(self, mode="first", size=(None,None), workers=1):
         """
         **SUMMARY**
 
-        Casts each in the image set into a 32F image, averages them together and returns the results.
+        Adds the images in the set one at a time into a 64F sum, averages them and returns the results.
         If the images are different sizes the method attempts to standarize them.
+        Only one image is resized at a time so the memory used doesn't grow with the size of the set.
 
         **PARAMETERS**
 
@@ -693,10 +749,13 @@ class ImageSet(list):
           * "fixed" - fixed, use the size tuple provided.
 
         * *size* - if the mode is set to fixed use this tuple as the size of the resulting image.
+        * *workers* - split the set across this many workers and merge their sums. Lazy sets
+          are decoded in worker processes, other sets are summed on threads.
 
         **RETURNS**
 
-        Returns a single image that is the average of all the values.
+        Returns a single image that is the average of all the values, or an
+        empty ImageSet if the set is empty.
 
         **EXAMPLE**
 
@@ -704,6 +763,7 @@ class ImageSet(list):
         >>> imgs.load("images/faces")
         >>> result = imgs.average(mode="first")
         >>> result.show()
+        >>> plate = ImageSet("./frames/", lazy=True).average(workers=4)
 
         **TODO**
         * Allow the user to pass in an offset parameters that blit the images into the resutl.
@@ -716,8 +776,8 @@ class ImageSet(list):
 
         vals = self.dimensions()
         if( mode.lower()  == "first" ):
-            fw = self[0].width
-            fh = self[0].height
+            fw = vals[0][0]
+            fh = vals[0][1]
         elif( mode.lower()  == "fixed" ):
             fw = size[0]
             fh = size[1]
@@ -730,21 +790,32 @@ class ImageSet(list):
         elif( mode.lower()  == "average" ):
             fw = int(np.average(vals[:,0]))
             fh = int(np.average(vals[:,1]))
-        #determine if we really need to resize the images
-        t1 = np.sum(vals[:,0]-fw)
-        t2 = np.sum(vals[:,1]-fh)
-        if( t1 != 0 or t2 != 0 ):
-            resized = self.standardize(fw,fh)
-        else:
-            resized = self
-        # Now do the average calculation
-        accumulator = cv.CreateImage((fw,fh), cv.IPL_DEPTH_8U,3)
-        cv.Zero(accumulator)
-        alpha = float(1.0/len(resized))
-        beta = float((len(resized)-1.0)/len(resized))
-        for i in resized:
-            cv.AddWeighted(i.getBitmap(),alpha,accumulator,beta,0,accumulator)
-        retVal =  Image(accumulator)
+        fw = int(fw)
+        fh = int(fh)
+        entries = list(list.__iter__(self))
+        if( workers > 1 and len(entries) > 1 ):
+            step = int(math.ceil(len(entries) / float(workers)))
+            chunks = [(entries[i:i+step], self._size, (fw,fh))
+                      for i in range(0, len(entries), step)]
+            if self.lazy:
+                pool = multiprocessing.Pool(len(chunks))
+            else:
+                pool = ThreadPool(len(chunks))
+            try:
+                results = [pool.apply_async(_sumImages, c) for c in chunks]
+                sums = [r.get() for r in results]
+            finally:
+                pool.terminate()
+            accumulator = sums[0][0]
+            count = sums[0][1]
+            for acc, n in sums[1:]:
+                accumulator += acc
+                count += n
+        else:
+            accumulator, count = _sumImages(entries, self._size, (fw,fh))
+
+        accumulator /= count
+        retVal = Image(np.around(accumulator).astype(np.uint8), cv2image=True)
         return retVal
 
 
@@ -758,7 +829,11 @@ class ImageSet(list):
 
         """
         if type(key) is types.SliceType: #Or can use 'try:' for speed
+            if self.lazy:
+                return self._lazyCopy(list.__getitem__(self, key))
             return ImageSet(list.__getitem__(self, key))
+        elif self.lazy:
+            return self._decode(list.__getitem__(self,key))
         else:
             return list.__getitem__(self,key)
 
@@ -768,6 +843,257 @@ class ImageSet(list):
         """
         return self.__getitem__(slice(i,j))
 
+    def __iter__(self):
+        if not self.lazy:
+            return list.__iter__(self)
+        return (self._decode(e) for e in list.__iter__(self))
+
+    def prefetch(self, depth=4, workers=2, processes=False, start=0, cycle=False):
+        """
+        **SUMMARY**
+
+        Iterate over the set while the next images are decoded in the
+        background. The images come back in order and at most depth images
+        are decoded ahead of the one being used. Only lazy sets have anything
+        to decode, other sets just yield their images.
+
+        **PARAMETERS**
+
+        * *depth* - the number of images decoded ahead of the consumer.
+        * *workers* - the number of decoding threads or processes.
+        * *processes* - if True decode in a process pool instead of threads.
+          This avoids the GIL but the pixels are pickled back to this process.
+        * *start* - the index of the first image.
+        * *cycle* - if True start over at the beginning after the last image.
+
+        **RETURNS**
+
+        A generator of SimpleCV Images.
+
+        **EXAMPLE**
+
+        >>> imgs = ImageSet("./frames/", lazy=True)
+        >>> for img in imgs.prefetch(depth=8, workers=4):
+        >>>     img.findBlobs()
+
+        """
+        n = len(self)
+        if n == 0:
+            return iter([])
+        entries = [list.__getitem__(self, i) for i in xrange(start, n)]
+        if cycle:
+            entries = itertools.chain(entries, itertools.cycle(list.__iter__(self)))
+        if not self.lazy:
+            return iter(entries)
+        return self._prefetchEntries(entries, depth, workers, processes)
+
+    def _prefetchEntries(self, entries, depth, workers, processes):
+        jobs = ((e, self._size) for e in entries)
+        images = _prefetch(_CachedImageLoader(self), jobs, depth, workers, processes)
+        for (entry, size), img in images:
+            yield self._remember(entry, img)
+
+    def getEXIFData(self, index):
+        """
+        **SUMMARY**
+
+        Return the EXIF data of an image in the set as a dict. For a lazy set
+        this is read from the file header without decoding the image.
+
+        **PARAMETERS**
+
+        * *index* - the index of the image in the set.
+
+        **RETURNS**
+
+        A dict of EXIF tags, empty if the file has none.
+
+        **EXAMPLE**
+
+        >>> imgs = ImageSet("./photos/", lazy=True)
+        >>> imgs.getEXIFData(0)
+
+        """
+        entry = list.__getitem__(self, index)
+        if not isinstance(entry, basestring):
+            return entry.getEXIFData()
+        if entry not in self._exif:
+            self._exif[entry] = _readEXIF(entry)
+        return self._exif[entry]
+
+    def _makeLazy(self, cacheSize):
+        self.lazy = True
+        self.cacheSize = cacheSize
+        if self._cache is None:
+            self._cache = OrderedDict()
+            self._headers = dict()
+            self._exif = dict()
+
+    def _lazyCopy(self, entries):
+        """
+        Make a lazy ImageSet of entries that shares this set's cache and headers.
+        """
+        retVal = ImageSet()
+        retVal.lazy = True
+        retVal.cacheSize = self.cacheSize
+        retVal._cache = self._cache
+        retVal._headers = self._headers
+        retVal._exif = self._exif
+        retVal._size = self._size
+        retVal.filelist = self.filelist
+        list.extend(retVal, entries)
+        return retVal
+
+    def _addPaths(self, paths):
+        """
+        Append image files to a lazy set, reading only their headers. Files
+        that can't be read are skipped. Returns the paths that were added.
+        """
+        added = []
+        for p in paths:
+            size = _readImageSize(p)
+            if size is None or size[0] <= 0 or size[1] <= 0:
+                continue
+            self._headers[p] = size
+            list.append(self, p)
+            added.append(p)
+        return added
+
+    def _entrySize(self, entry):
+        if not isinstance(entry, basestring):
+            return (entry.width, entry.height)
+        if self._size is not None:
+            return self._size
+        if entry not in self._headers:
+            self._headers[entry] = _readImageSize(entry)
+        return self._headers[entry]
+
+    def _decode(self, entry):
+        """
+        Return the Image for an entry of a lazy set, decoding the file if it is
+        not in the cache and evicting the least recently used images.
+        """
+        if not isinstance(entry, basestring):
+            return entry
+        img = self._cache.get((entry, self._size))
+        if img is None:
+            img = _loadImage(entry, self._size)
+        return self._remember(entry, img)
+
+    def _remember(self, entry, img):
+        """
+        Put a decoded image in the LRU of a lazy set as the most recently used.
+        """
+        if not isinstance(entry, basestring):
+            return img
+        key = (entry, self._size)
+        self._cache.pop(key, None)
+        if self.cacheSize > 0:
+            while len(self._cache) >= self.cacheSize:
+                self._cache.popitem(last=False)
+            self._cache[key] = img
+        return img
+
+
+def _loadImage(path, size=None):
+    """
+    Decode an image file, resized to size if given. This is a module level
+    function so that it can be sent to a process pool.
+    """
+    img = Image(path)
+    if size is not None:
+        img = img.resize(*size)
+        img.filename = path
+    return img
+
+def _sumImages(entries, size, target):
+    """
+    Add ImageSet entries (Images or file paths, see ImageSet._decode) one at a
+    time into a 64F sum the size of target. Returns the sum and the count.
+    """
+    fw, fh = target
+    accumulator = np.zeros((fh, fw, 3), dtype=np.float64)
+    for e in entries:
+        if isinstance(e, basestring):
+            e = _loadImage(e, size)
+        if e.size() != target:
+            e = e.resize(fw, fh)
+        accumulator += e.getNumpyCv2()
+    return accumulator, len(entries)
+
+def _tryLoadImage(path):
+    try:
+        return Image(path)
+    except:
+        return None
+
+class _CachedImageLoader(object):
+    """
+    Decode job for ImageSet.prefetch(). Images already in the set's cache are
+    passed through rather than decoded again.
+    """
+    def __init__(self, imageset):
+        self.cache = imageset._cache
+
+    def __call__(self, entry, size):
+        if not isinstance(entry, basestring):
+            return ((entry, size), entry)
+        img = self.cache.get((entry, size))
+        if img is None:
+            img = _loadImage(entry, size)
+        return ((entry, size), img)
+
+    def __getstate__(self):
+        #worker processes don't get the cache
+        return {"cache": {}}
+
+def _prefetch(func, args, depth=4, workers=2, processes=False):
+    """
+    Yield func(*a) for every tuple a in args, in order, while up to depth
+    calls run ahead on a pool of worker threads (or processes).
+    """
+    if processes:
+        pool = multiprocessing.Pool(workers)
+    else:
+        pool = ThreadPool(workers)
+    pending = deque()
+    args = iter(args)
+    try:
+        for a in itertools.islice(args, max(depth, 1)):
+            pending.append(pool.apply_async(func, a))
+        while pending:
+            result = pending.popleft().get()
+            for a in itertools.islice(args, 1):
+                pending.append(pool.apply_async(func, a))
+            yield result
+    finally:
+        pool.terminate()
+
+def _readImageSize(path):
+    """
+    Return the (width, height) of an image file from its header, only decoding
+    the file when PIL can't read it. Returns None if the file isn't an image.
+    """
+    if PIL_ENABLED:
+        try:
+            return pil.open(path).size
+        except:
+            pass
+    try:
+        return Image(path).size()
+    except:
+        return None
+
+def _readEXIF(path):
+    fileExtension = os.path.splitext(path)[1].lower()
+    if( fileExtension not in ['.jpeg', '.jpg', '.tiff', '.tif'] ):
+        return {}
+    raw = open(path,'rb')
+    try:
+        return process_file(raw, details=False)
+    finally:
+        raw.close()
+
 
 class Image:
     """
@@ -835,6 +1161,7 @@ class Image:
     _pgsurface = ""
     _cv2Numpy = None #numpy array for OpenCV >= 2.3
     _cv2GrayNumpy = None #grayscale numpy array for OpenCV >= 2.3
+    _sharedStore = False #True when _cv2Numpy is the only pixel store and the rest are views
     _gridLayer = [None,[0,0]]#to store grid details | Format -> [gridIndex , gridDimensions]
 
     #For DFT Caching
@@ -844,27 +1171,64 @@ class Image:
     _mKeyPoints = None
     _mKPDescriptors = None
     _mKPFlavor = "NONE"
+    _mKPParams = None #(thresh, highQuality) that created _mKeyPoints
+    _mKPDigest = None #hash of the grayscale pixels, the key of the process wide keypoint cache
 
     #temp files
     _tempFiles = []
 
+    #FramePool the bitmap was borrowed from, and the borrowed bitmap
+    _mPool = None
+    _mPoolBitmap = None
+
     #when we empty the buffers, populate with this:
     _initialized_buffers = {
         "_bitmap": "",
         "_matrix": "",
-        "_grayMatrix": "",
-        "_graybitmap": "",
-        "_equalizedgraybitmap": "",
         "_blobLabel": "",
-        "_edgeMap": "",
-        "_cannyparam": (0, 0),
         "_pil": "",
         "_numpy": "",
-        "_grayNumpy":"",
         "_pgsurface": "",
-        "_cv2GrayNumpy": "",
         "_cv2Numpy":""}
 
+    #generation counter of the pixel data, bumped by _clearBuffers
+    _mGeneration = 0
+
+    #buffers derived from the pixels, grouped by the stamp holding the
+    #generation they were built from, with the values they reset to
+    _grayGen = 0
+    _edgeGen = 0
+    _DFTGen = 0
+    _mKPGen = 0
+    _mPaletteGen = 0
+    _derivedBuffers = {
+        "_grayGen": {
+            "_graybitmap": "",
+            "_grayMatrix": "",
+            "_grayNumpy": "",
+            "_cv2GrayNumpy": "",
+            "_equalizedgraybitmap": ""},
+        "_edgeGen": {
+            "_edgeMap": "",
+            "_cannyparam": (0, 0)},
+        "_DFTGen": {
+            "_DFT": []},
+        "_mKPGen": {
+            "_mKeyPoints": None,
+            "_mKPDescriptors": None,
+            "_mKPFlavor": "NONE",
+            "_mKPParams": None,
+            "_mKPDigest": None},
+        "_mPaletteGen": {
+            "_mDoHuePalette": False,
+            "_mPaletteBins": None,
+            "_mPalette": None,
+            "_mPaletteMembers": None,
+            "_mPalettePercentages": None}}
+
+    #with a shared store these are all views of the same pixels, so they are never cleared
+    _sharedBuffers = ("_bitmap", "_matrix", "_numpy", "_cv2Numpy")
+
     #The variables _uncroppedX and _uncroppedY are used to buffer the points when we crop the image.
     _uncroppedX = 0
     _uncroppedY = 0
@@ -1007,9 +1371,14 @@ class Image:
                     invertedsource = source
 
                 #invertedsource = source[:, :, ::-1].transpose([1, 0, 2]) # do not un-comment. breaks cv2 image support
-                self._bitmap = cv.CreateImageHeader((invertedsource.shape[1], invertedsource.shape[0]), cv.IPL_DEPTH_8U, 3)
-                cv.SetData(self._bitmap, invertedsource.tostring(),
-                    invertedsource.dtype.itemsize * 3 * invertedsource.shape[1])
+                if init_options_handler.shared_buffers:
+                    #a single copy straight into the store, no intermediate string
+                    self._numpy = ""
+                    self._cv2Numpy = np.ascontiguousarray(invertedsource)
+                else:
+                    self._bitmap = cv.CreateImageHeader((invertedsource.shape[1], invertedsource.shape[0]), cv.IPL_DEPTH_8U, 3)
+                    cv.SetData(self._bitmap, invertedsource.tostring(),
+                        invertedsource.dtype.itemsize * 3 * invertedsource.shape[1])
                 self._colorSpace = ColorSpace.BGR #this is an educated guess
             else:
                 #we have a single channel array, convert to an RGB iplimage
@@ -1112,6 +1481,8 @@ class Image:
         if(colorSpace != ColorSpace.UNKNOWN):
             self._colorSpace = colorSpace
 
+        if init_options_handler.shared_buffers:
+            self._toSharedStore()
 
         bm = self.getBitmap()
         self.width = bm.width
@@ -1129,6 +1500,29 @@ class Image:
                     os.remove(i[0])
         except :
             pass
+        if self._mPool is not None:
+            self._mPool.release(self._mPoolBitmap)
+
+    def _toSharedStore(self):
+        """
+        Move the pixels into one contiguous BGR numpy array (_cv2Numpy) and
+        drop every other representation. Afterwards getBitmap(), getMatrix(),
+        getNumpy() and getNumpyCv2() only build headers or views over that
+        array. See InitOptionsHandler.set_shared_buffers().
+        """
+        if type(self._cv2Numpy) is not np.ndarray:
+            if self._bitmap:
+                src = cv.GetMat(self._bitmap)
+            else:
+                src = self._matrix
+            self._cv2Numpy = np.ascontiguousarray(np.asarray(src), dtype=np.uint8).copy()
+        elif not self._cv2Numpy.flags['C_CONTIGUOUS']:
+            self._cv2Numpy = np.ascontiguousarray(self._cv2Numpy)
+
+        self._bitmap = ""
+        self._matrix = ""
+        self._numpy = ""
+        self._sharedStore = True
 
     def getEXIFData(self):
         """
@@ -1798,6 +2192,9 @@ class Image:
             return self._bitmap
         elif (self._matrix):
             self._bitmap = cv.GetImage(self._matrix)
+        elif (self._sharedStore):
+            #header over the shared store, no pixels are copied
+            self._bitmap = cv.GetImage(self.getMatrix())
         return self._bitmap
 
 
@@ -1831,6 +2228,9 @@ class Image:
         """
         if (self._matrix):
             return self._matrix
+        elif (self._sharedStore):
+            self._matrix = cv.fromarray(self._cv2Numpy) #header over the shared store
+            return self._matrix
         else:
             self._matrix = cv.GetMat(self.getBitmap()) #convert the bitmap to a matrix
             return self._matrix
@@ -1934,8 +2334,12 @@ class Image:
         :py:meth:`getGrayscaleMatrix`
 
         """
+        self._validateBuffers("_grayGen")
         if( self._grayNumpy != "" ):
             return self._grayNumpy
+        elif( self._sharedStore ):
+            self._grayNumpy = self.getGrayNumpyCv2().transpose()
+            self._grayNumpy.flags.writeable = False
         else:
             self._grayNumpy = uint8(np.array(cv.GetMat(self._getGrayscaleBitmap())).transpose())
 
@@ -1956,6 +2360,11 @@ class Image:
         >>> img = Image("lenna")
         >>> rawImg  = img.getNumpy()
 
+        **NOTES**
+
+        With init_options_handler.set_shared_buffers() the returned array is
+        a read only view of the image pixels, use rawImg.copy() to modify it.
+
         **SEE ALSO**
 
         :py:meth:`getEmpty`
@@ -1970,6 +2379,11 @@ class Image:
         if self._numpy != "":
             return self._numpy
 
+        if self._sharedStore:
+            #a read only view, copy it before writing to it
+            self._numpy = self._cv2Numpy[:, :, ::-1].transpose([1, 0, 2])
+            self._numpy.flags.writeable = False
+            return self._numpy
 
         self._numpy = np.array(self.getMatrix())[:, :, ::-1].transpose([1, 0, 2])
         return self._numpy
@@ -1989,6 +2403,11 @@ class Image:
         >>> img = Image("lenna")
         >>> rawImg  = img.getNumpyCv2()
 
+        **NOTES**
+
+        With init_options_handler.set_shared_buffers() this is the pixel store
+        of the image itself, writing to it changes the image.
+
         **SEE ALSO**
 
         :py:meth:`getEmpty`
@@ -2033,16 +2452,25 @@ class Image:
         :py:meth:`getGrayNumpyCv2`
 
         """
-        if type(self._cv2GrayNumpy) is not np.ndarray:
+        self._validateBuffers("_grayGen")
+        if self._sharedStore:
+            self._getGrayscaleBitmap() #fills _cv2GrayNumpy in place
+        elif type(self._cv2GrayNumpy) is not np.ndarray:
             self._cv2GrayNumpy = np.array(self.getGrayscaleMatrix())
         return self._cv2GrayNumpy
 
     def _getGrayscaleBitmap(self):
+        self._validateBuffers("_grayGen")
         if (self._graybitmap):
             return self._graybitmap
 
 
-        self._graybitmap = self.getEmpty(1)
+        if self._sharedStore:
+            #the gray bitmap is a header over its own numpy array
+            self._cv2GrayNumpy = np.empty((self.height, self.width), dtype=np.uint8)
+            self._graybitmap = cv.GetImage(cv.fromarray(self._cv2GrayNumpy))
+        else:
+            self._graybitmap = self.getEmpty(1)
         temp = self.getEmpty(3)
         if( self._colorSpace == ColorSpace.BGR or
                 self._colorSpace == ColorSpace.UNKNOWN ):
@@ -2094,6 +2522,7 @@ class Image:
         :py:meth:`getMatrix`
 
         """
+        self._validateBuffers("_grayGen")
         if (self._grayMatrix):
             return self._grayMatrix
         else:
@@ -2102,6 +2531,7 @@ class Image:
 
 
     def _getEqualizedGrayscaleBitmap(self):
+        self._validateBuffers("_grayGen")
         if (self._equalizedgraybitmap):
             return self._equalizedgraybitmap
 
@@ -2279,9 +2709,9 @@ class Image:
 
 
             if (type(fh) == InstanceType and fh.__class__.__name__ == "JpegStreamer"):
-                fh.jpgdata = StringIO()
-                saveimg.getPIL().save(fh.jpgdata, "jpeg", **params) #save via PIL to a StringIO handle
-                fh.refreshtime = time.time()
+                jpgdata = StringIO()
+                saveimg.getPIL().save(jpgdata, "jpeg", **params) #save via PIL to a StringIO handle
+                fh.publish(jpgdata.getvalue())
                 self.filename = ""
                 self.filehandle = fh
 
@@ -3419,7 +3849,7 @@ class Image:
         return FeatureSet(corner_features)
 
 
-    def findBlobs(self, threshval = -1, minsize=10, maxsize=0, threshblocksize=0, threshconstant=5,appx_level=3):
+    def findBlobs(self, threshval = -1, minsize=10, maxsize=0, threshblocksize=0, threshconstant=5,appx_level=3,output="blobs"):
         """
         
         **SUMMARY**
@@ -3451,10 +3881,14 @@ class Image:
 
         * *threshconstant* - The difference from the local mean to use for thresholding in Otsu's method. *TODO - make this match binarize*
 
+        * *output* - "blobs" for a FeatureSet of Blob features, or "table" for a :py:class:`BlobTable`,
+          which is much faster when there are thousands of blobs.
+
 
         **RETURNS**
 
         Returns a featureset (basically a list) of :py:class:`blob` features. If no blobs are found this method returns None.
+        With output="table" a BlobTable is returned, which is empty if no blobs are found.
 
         **EXAMPLE**
 
@@ -3479,13 +3913,18 @@ class Image:
         :py:meth:`erode`
         :py:meth:`findBlobsFromPalette`
         :py:meth:`smartFindBlobs`
+        :py:class:`BlobTable`
         """
         if (maxsize == 0):
             maxsize = self.width * self.height
         #create a single channel image, thresholded to parameters
 
         blobmaker = BlobMaker()
-        blobs = blobmaker.extractFromBinary(self.binarize(threshval, 255, threshblocksize, threshconstant).invert(),
+        binary = self.binarize(threshval, 255, threshblocksize, threshconstant).invert()
+        if output == "table":
+            return blobmaker.extractTable(binary, self, minsize = minsize, maxsize = maxsize)
+
+        blobs = blobmaker.extractFromBinary(binary,
             self, minsize = minsize, maxsize = maxsize,appx_level=appx_level)
 
         if not len(blobs):
@@ -4787,11 +5226,49 @@ class Image:
 
 
     def _clearBuffers(self, clearexcept = "_bitmap"):
+        #derived buffers are dropped lazily by _validateBuffers
+        self._mGeneration += 1
         for k, v in self._initialized_buffers.items():
             if k == clearexcept:
                 continue
+            if self._sharedStore and k in self._sharedBuffers:
+                continue
             self.__dict__[k] = v
 
+    def _validateBuffers(self, stamp):
+        """
+        Reset the derived buffers guarded by stamp (see _derivedBuffers) if the
+        pixels have changed since they were built.
+        """
+        if getattr(self, stamp) == self._mGeneration:
+            return
+        for k, v in self._derivedBuffers[stamp].items():
+            self.__dict__[k] = copy.copy(v)
+        self.__dict__[stamp] = self._mGeneration
+
+    def markDirty(self):
+        """
+        **SUMMARY**
+
+        Tell the image that its pixels were changed behind its back, for example
+        by an OpenCV call writing to getBitmap() or, with shared buffers, by
+        writing to the array returned by getNumpyCv2(). Cached grayscale, edge,
+        DFT, keypoint and palette data are rebuilt the next time they are used.
+
+        **RETURNS**
+
+        Nothing.
+
+        **EXAMPLE**
+
+        >>> img = Image("lenna")
+        >>> cv.Circle(img.getBitmap(), (100, 100), 20, cv.Scalar(0, 0, 255), -1)
+        >>> img.markDirty()
+        >>> img.edges().show()
+
+        """
+        self._clearBuffers()
+
 
     def findBarcode(self,doZLib=True,zxing_path=""):
         """
@@ -5153,6 +5630,7 @@ class Image:
         """
 
 
+        self._validateBuffers("_edgeGen")
         if (self._edgeMap and self._cannyparam[0] == t1 and self._cannyparam[1] == t2):
             return self._edgeMap
 
@@ -7512,7 +7990,7 @@ class Image:
             cv.Filter2D(self.getBitmap(),retVal,myKernel,center)
         return Image(retVal)
 
-    def findTemplate(self, template_image = None, threshold = 5, method = "SQR_DIFF_NORM", grayscale=True, rawmatches = False):
+    def findTemplate(self, template_image = None, threshold = 5, method = "SQR_DIFF_NORM", grayscale=True, rawmatches = False, scales = None):
         """
         **SUMMARY**
 
@@ -7533,9 +8011,10 @@ class Image:
 
         This method returns the locations of wherever it finds a match above a
         threshold. Because of how template matching works, very often multiple
-        instances of the template overlap significantly. The best approach is to
-        find the centroid of all of these values. We suggest using an iterative
-        k-means approach to find the centroids.
+        instances of the template overlap significantly. Only the best match in
+        each template sized neighbourhood is kept, and matches overlapping a
+        better one are dropped. Set rawmatches to get every location above the
+        threshold instead.
 
 
         **PARAMETERS**
@@ -7551,6 +8030,14 @@ class Image:
           * CCORR         - Cross correlation
           * CCORR_NORM    - Normalize cross correlation
         * *grayscale* - Boolean - If false, template Match is found using BGR image.
+        * *rawmatches* - Boolean - If true, return every location above the threshold
+          without suppressing overlapping matches.
+        * *scales* - A list of scales to match the template at, e.g. [0.8, 1.0, 1.25].
+
+        The template_image can also be a list of templates or a :py:class:`TemplateBank`.
+        The image is then prepared once and shared by all the templates and scales,
+        and each match has its template_index and scale set. To match the same
+        templates against many images build the TemplateBank once and pass it in.
         
         **EXAMPLE**
 
@@ -7560,11 +8047,22 @@ class Image:
         >>> found_patterns.draw()
         >>> image.show()
 
+        >>> bank = TemplateBank([Image("bolt.png"), Image("nut.png")], scales=[0.9, 1.0, 1.1])
+        >>> found_parts = image.findTemplate(bank)
+
         **RETURNS**
 
         This method returns a FeatureSet of TemplateMatch objects.
 
         """
+        if(isinstance(template_image, (list, tuple)) or
+           (scales is not None and not isinstance(template_image, TemplateBank))):
+            if not isinstance(template_image, (list, tuple)):
+                template_image = [template_image]
+            template_image = TemplateBank(template_image, scales, method, grayscale)
+        if(isinstance(template_image, TemplateBank)):
+            return template_image.match(self, threshold, rawmatches)
+
         if(template_image == None):
             logger.info( "Need image for matching")
             return
@@ -7605,43 +8103,33 @@ class Image:
             cv.MatchTemplate( self._getGrayscaleBitmap(), template_image._getGrayscaleBitmap(), matches, method )
         else:
             cv.MatchTemplate( self.getBitmap(), template_image.getBitmap(), matches, method )
-        mean = np.mean(matches)
-        sd = np.std(matches)
-        if(check > 0):
-            compute = np.where((matches < mean-threshold*sd) )
-        else:
-            compute = np.where((matches > mean+threshold*sd) )
-
-        mapped = map(tuple, np.column_stack(compute))
-        fs = FeatureSet()
-        for location in mapped:
-            fs.append(TemplateMatch(self, template_image, (location[1],location[0]), matches[location[0], location[1]]))
 
         if (rawmatches):
-            return fs
-        #cluster overlapping template matches
-        finalfs = FeatureSet()
-        if( len(fs) > 0 ):
-            finalfs.append(fs[0])
-            for f in fs:
-                match = False
-                for f2 in finalfs:
-                    if( f2._templateOverlaps(f) ): #if they overlap
-                        f2.consume(f) #merge them
-                        match = True
-                        break
-
-                if( not match ):
-                    finalfs.append(f)
-
-            for f in finalfs: #rescale the resulting clusters to fit the template size
-                f.rescale(template_image.width,template_image.height)
+            mean = np.mean(matches)
+            sd = np.std(matches)
+            if(check > 0):
+                compute = np.where((matches < mean-threshold*sd) )
+            else:
+                compute = np.where((matches > mean+threshold*sd) )
 
-            fs = finalfs
+            mapped = map(tuple, np.column_stack(compute))
+            fs = FeatureSet()
+            for location in mapped:
+                fs.append(TemplateMatch(self, template_image, (location[1],location[0]), matches[location[0], location[1]]))
+            return fs
 
+        #keep the local best matches and drop the ones overlapping a better match,
+        #TemplateMatch features are only made for the survivors
+        w = template_image.width
+        h = template_image.height
+        (xs, ys, scores) = _templatePeaks(matches, w, h, threshold, check)
+        boxes = np.column_stack((xs, ys, np.repeat(w, len(xs)), np.repeat(h, len(xs))))
+        fs = FeatureSet()
+        for i in _suppressOverlaps(boxes, scores, check):
+            fs.append(TemplateMatch(self, template_image, (int(xs[i]), int(ys[i])), scores[i]))
         return fs
 
-    def findTemplateOnce(self, template_image = None, threshold = 0.2, method = "SQR_DIFF_NORM", grayscale=True):
+    def findTemplateOnce(self, template_image = None, threshold = 0.2, method = "SQR_DIFF_NORM", grayscale=True, scales = None):
         """
         **SUMMARY**
 
@@ -7667,6 +8155,10 @@ class Image:
           * CCORR         - Cross correlation
           * CCORR_NORM    - Normalize cross correlation
         * *grayscale* - Boolean - If false, template Match is found using BGR image.
+        * *scales* - A list of scales to match the template at, e.g. [0.8, 1.0, 1.25].
+
+        The template_image can also be a list of templates or a :py:class:`TemplateBank`,
+        in which case the best match of every template is returned.
         
         **EXAMPLE**
 
@@ -7681,6 +8173,14 @@ class Image:
         This method returns a FeatureSet of TemplateMatch objects.
 
         """
+        if(isinstance(template_image, (list, tuple)) or
+           (scales is not None and not isinstance(template_image, TemplateBank))):
+            if not isinstance(template_image, (list, tuple)):
+                template_image = [template_image]
+            template_image = TemplateBank(template_image, scales, method, grayscale)
+        if(isinstance(template_image, TemplateBank)):
+            return template_image.matchOnce(self, threshold)
+
         if(template_image == None):
             logger.info( "Need image for template matching.")
             return
@@ -8120,6 +8620,14 @@ class Image:
                      force reset is True we always recalculate the values, otherwise
                      we will used the cached copies.
 
+                     Besides this image's own copy, the keypoints of the last few
+                     images can be kept for the whole process, by pixel content and by
+                     flavor, thresh and highQuality, so the same picture loaded again
+                     or matched with several flavors in turn isn't searched twice.
+                     This is off unless init_options_handler.set_keypoint_cache_size()
+                     is given a size, as it hashes the pixels of every image. The cached
+                     keypoints and descriptors are shared, don't modify them.
+
         Returns:
         A tuple of keypoint objects and optionally a numpy array of the descriptors.
 
@@ -8155,6 +8663,7 @@ class Image:
             warnings.warn("Can't run Keypoints without OpenCV >= 2.3.0")
             return (None, None)
 
+        self._validateBuffers("_mKPGen")
         if( forceReset ):
             self._mKeyPoints = None
             self._mKPDescriptors = None
@@ -8165,9 +8674,26 @@ class Image:
             warnings.warn("Invalid choice of keypoint detector.")
             return (None, None)
 
-        if self._mKeyPoints != None and self._mKPFlavor == flavor:
+        if (self._mKeyPoints != None and self._mKPFlavor == flavor and
+                self._mKPParams == (thresh, highQuality)):
             return (self._mKeyPoints, self._mKPDescriptors)
 
+        self._mKeyPoints = None
+        self._mKPDescriptors = None
+        self._mKPFlavor = "NONE"
+        kpKey = (flavor, (thresh, highQuality))
+
+        cacheKey = None
+        if( init_options_handler.keypoint_cache_size > 0 ):
+            cacheKey = (self._keypointDigest(), flavor, thresh, highQuality)
+            cached = None
+            if not forceReset:
+                cached = _keypointCacheGet(cacheKey)
+            if cached is not None:
+                self._mKeyPoints, self._mKPDescriptors = cached
+                self._mKPFlavor, self._mKPParams = kpKey
+                return cached
+
         if hasattr(cv2, flavor):
 
             if flavor == "SURF":
@@ -8216,8 +8742,24 @@ class Image:
         else:
             warnings.warn("SimpleCV can't seem to find appropriate function with your OpenCV version.")
             return (None, None)
+        self._mKPFlavor, self._mKPParams = kpKey
+        if( cacheKey is not None ):
+            _keypointCachePut(cacheKey, (self._mKeyPoints, self._mKPDescriptors))
         return (self._mKeyPoints, self._mKPDescriptors)
 
+    def _keypointDigest(self):
+        """
+        A hash of the size and grayscale pixels of the image, which is what the
+        keypoint detectors see. It is kept until the pixels change.
+        """
+        self._validateBuffers("_mKPGen")
+        if( self._mKPDigest is None ):
+            gray = np.ascontiguousarray(self.getGrayNumpy())
+            digest = hashlib.md5(str(gray.shape))
+            digest.update(gray.data)
+            self._mKPDigest = digest.hexdigest()
+        return self._mKPDigest
+
     def _getFLANNMatches(self,sd,td):
         """
         Summary:
@@ -8370,7 +8912,9 @@ class Image:
 
         **PARAMETERS**
 
-        * *template* - A template image.
+        * *template* - A template image, or a KeypointIndex of many templates. With an index the
+          quality (and keypoint flavor) is the one the index was built with, minDist and minMatch
+          are used as given, and every template of the index that is found gets a match.
         * *quality* - The feature quality metric. This can be any value between about 300 and 500. Higher
           values should return fewer, but higher quality features.
         * *minDist* - The value below which the feature correspondence is considered a match. This
@@ -8383,7 +8927,8 @@ class Image:
         **RETURNS**
 
         If a homography (match) is found this method returns a feature set with a single
-        KeypointMatch feature. If no match is found None is returned.
+        KeypointMatch feature. If no match is found None is returned. With a KeypointIndex
+        there is a KeypointMatch for each template found, with template_index set.
 
         **EXAMPLE**
 
@@ -8410,6 +8955,7 @@ class Image:
         :py:meth:`_getFLANNMatches`
         :py:meth:`drawKeypointMatches`
         :py:meth:`findKeypoints`
+        :py:class:`KeypointIndex`
 
         """
         try:
@@ -8420,6 +8966,11 @@ class Image:
             
         if template == None:
           return None
+        if isinstance(template, KeypointIndex):
+            fs = template.match(self, minDist, minMatch)
+            if( len(fs) == 0 ):
+                return None
+            return fs
         fs = FeatureSet()
         skp,sd = self._getRawKeypoints(quality)
         tkp,td = template._getRawKeypoints(quality)
@@ -8593,7 +9144,7 @@ class Image:
 
         return fs
 
-    def findMotion(self, previous_frame, window=11, method='BM', aggregate=True):
+    def findMotion(self, previous_frame, window=11, method='BM', aggregate=True, dense=False, engine=None):
         """
         **SUMMARY**
 
@@ -8621,10 +9172,14 @@ class Image:
           motion around the sample grid defined by window. If aggregate is false
           we just return the the value as sampled at the window grid interval. For
           block matching this flag is ignored.
+        * *dense* - If dense is true return a MotionField, which holds the sample positions
+          and flow vectors as NumPy arrays, instead of a Motion feature per sample.
+        * *engine* - A FlowEngine to compute the flow with, in place of method, window
+          and aggregate. An engine reuses its buffers between frames of a stream.
 
         **RETURNS**
 
-        A featureset of motion objects.
+        A featureset of motion objects, or a MotionField if dense is true.
 
         **EXAMPLES**
 
@@ -8634,114 +9189,23 @@ class Image:
         >>> motion = img2.findMotion(img1)
         >>> motion.draw()
         >>> img2.show()
+        >>> field = img2.findMotion(img1, dense=True)
+        >>> print field.dx.mean(), field.dy.mean()
 
         **SEE ALSO**
 
         :py:class:`Motion`
+        :py:class:`MotionField`
+        :py:class:`FlowEngine`
         :py:class:`FeatureSet`
 
         """
-        try:
-            import cv2
-            ver = cv2.__version__
-            #For OpenCV versions till 2.4.0,  cv2.__versions__ are of the form "$Rev: 4557 $"
-            if not ver.startswith('$Rev:') :
-                if int(ver.replace('.','0'))>=20400 :
-                    FLAG_VER = 1
-                    if (window > 9):
-                        window = 9
-            else :
-                FLAG_VER = 0
-        except :
-            FLAG_VER = 0
-
-        if( self.width != previous_frame.width or self.height != previous_frame.height):
-            logger.warning("ImageClass.getMotion: To find motion the current and previous frames must match")
-            return None
-        fs = FeatureSet()
-        max_mag = 0.00
-
-        if( method == "LK" or method == "HS" ):
-            # create the result images.
-            xf = cv.CreateImage((self.width, self.height), cv.IPL_DEPTH_32F, 1)
-            yf = cv.CreateImage((self.width, self.height), cv.IPL_DEPTH_32F, 1)
-            win = (window,window)
-            if( method == "LK" ):
-                cv.CalcOpticalFlowLK(self._getGrayscaleBitmap(),previous_frame._getGrayscaleBitmap(),win,xf,yf)
-            else:
-                cv.CalcOpticalFlowHS(previous_frame._getGrayscaleBitmap(),self._getGrayscaleBitmap(),0,xf,yf,1.0,(cv.CV_TERMCRIT_ITER | cv.CV_TERMCRIT_EPS, 10, 0.01))
-
-            w = math.floor((float(window))/2.0)
-            cx = ((self.width-window)/window)+1 #our sample rate
-            cy = ((self.height-window)/window)+1
-            vx = 0.00
-            vy = 0.00
-            for x in range(0,int(cx)): # go through our sample grid
-                for y in range(0,int(cy)):
-                    xi = (x*window)+w # calculate the sample point
-                    yi = (y*window)+w
-                    if( aggregate ):
-                        lowx = int(xi-w)
-                        highx = int(xi+w)
-                        lowy = int(yi-w)
-                        highy = int(yi+w)
-                        xderp = xf[lowy:highy,lowx:highx] # get the average x/y components in the output
-                        yderp = yf[lowy:highy,lowx:highx]
-                        vx = np.average(xderp)
-                        vy = np.average(yderp)
-                    else: # other wise just sample
-                        vx = xf[yi,xi]
-                        vy = yf[yi,xi]
-
-                    mag = (vx*vx)+(vy*vy)
-                    if(mag > max_mag): # calculate the max magnitude for normalizing our vectors
-                        max_mag = mag
-                    fs.append(Motion(self,xi,yi,vx,vy,window)) # add the sample to the feature set
-
-        elif( method == "BM"):
-            # In the interest of keep the parameter list short
-            # I am pegging these to the window size.
-            # For versions with OpenCV 2.4.0 and below.
-            if ( FLAG_VER==0):
-                block = (window,window) # block size
-                shift = (int(window*1.2),int(window*1.2)) # how far to shift the block
-                spread = (window*2,window*2) # the search windows.
-                wv = (self.width - block[0]) / shift[0] # the result image size
-                hv = (self.height - block[1]) / shift[1]
-                xf = cv.CreateMat(hv, wv, cv.CV_32FC1)
-                yf = cv.CreateMat(hv, wv, cv.CV_32FC1)
-                cv.CalcOpticalFlowBM(previous_frame._getGrayscaleBitmap(),self._getGrayscaleBitmap(),block,shift,spread,0,xf,yf)
-
-            #For versions with OpenCV 2.4.0 and above.
-            elif ( FLAG_VER==1) :
-                block = (window,window) # block size
-                shift = (int(window*0.2),int(window*0.2)) # how far to shift the block
-                spread = (window,window) # the search windows.
-                wv = self.width-block[0]+shift[0]
-                hv = self.height-block[1]+shift[1]
-                xf = cv.CreateImage((wv,hv), cv.IPL_DEPTH_32F, 1)
-                yf = cv.CreateImage((wv,hv), cv.IPL_DEPTH_32F, 1)
-                cv.CalcOpticalFlowBM(previous_frame._getGrayscaleBitmap(),self._getGrayscaleBitmap(),block,shift,spread,0,xf,yf)
-
-            for x in range(0,int(wv)): # go through the sample grid
-                for y in range(0,int(hv)):
-                    xi = (shift[0]*(x))+block[0] #where on the input image the samples live
-                    yi = (shift[1]*(y))+block[1]
-                    vx = xf[y,x] # the result image values
-                    vy = yf[y,x]
-                    fs.append(Motion(self,xi,yi,vx,vy,window)) # add the feature
-                    mag = (vx*vx)+(vy*vy) # same the magnitude
-                    if(mag > max_mag):
-                        max_mag = mag
-        else:
-            logger.warning("ImageClass.findMotion: I don't know what algorithm you want to use. Valid method choices are Block Matching -> \"BM\" Horn-Schunck -> \"HS\" and Lucas-Kanade->\"LK\" ")
-            return None
-
-        max_mag = math.sqrt(max_mag) # do the normalization
-        for f in fs:
-            f.normalizeTo(max_mag)
-
-        return fs
+        if( engine is None ):
+            engine = FlowEngine(method, window, aggregate)
+        field = engine.compute(self, previous_frame)
+        if( field is None or dense ):
+            return field
+        return field.toFeatureSet()
 
 
 
@@ -8795,6 +9259,7 @@ class Image:
         ImageClass.binarizeFromPalette(self, palette_selection)
         ImageClass.findBlobsFromPalette(self, palette_selection, dilate = 0, minsize=5, maxsize=0)
         """
+        self._validateBuffers("_mPaletteGen")
         if( self._mPaletteBins != bins or
             self._mDoHuePalette != hue ):
             total = float(self.width*self.height)
@@ -9896,6 +10361,7 @@ class Image:
         http://opencv.itseez.com/modules/core/doc/operations_on_arrays.html#getoptimaldftsize
 
         """
+        self._validateBuffers("_DFTGen")
         if( grayscale and (len(self._DFT) == 0 or len(self._DFT) == 3)):
             self._DFT = []
             img = self._getGrayscaleBitmap()
@@ -13641,6 +14107,8 @@ class Image:
             return None
         detector = cv2.FeatureDetector_create(flavor)
         extractor = cv2.DescriptorExtractor_create("FREAK")
+        self._validateBuffers("_mKPGen")
+        self._mKPFlavor = "NONE" #not a _getRawKeypoints result
         self._mKeyPoints = detector.detect(self.getGrayNumpyCv2())
         self._mKeyPoints, self._mKPDescriptors = extractor.compute(self.getGrayNumpyCv2(), 
                                                                    self._mKeyPoints)
@@ -14752,7 +15220,117 @@ class Image:
         filteredimage = flt.applyFilter(self, grayscale)
         return filteredimage
 
+
+class FramePool(object):
+    """
+    **SUMMARY**
+
+    A pool of preallocated 8-bit frame bitmaps for cameras. wrap() copies a
+    captured frame into a free bitmap and returns an Image that uses that
+    bitmap directly. The bitmap goes back to the pool when the Image is
+    garbage collected, so a steady capture loop doesn't allocate any frames.
+
+    .. Warning::
+      A bitmap is reused as soon as its Image is collected. Don't keep the
+      result of getBitmap() or getMatrix() of a pooled Image around after the
+      Image itself is gone, copy() it instead.
+
+    **EXAMPLE**
+
+    >>> cam = Camera(framepool=FramePool(count=8))
+    >>> while True:
+    >>>     cam.getImage().findBlobs()
+
+    """
+
+    def __init__(self, size=None, count=4, channels=3):
+        """
+        **PARAMETERS**
+
+        * *size* - the (width, height) of the frames, if known up front.
+        * *count* - the number of bitmaps to preallocate when the size is known.
+        * *channels* - the number of channels of the bitmaps.
+        """
+        self.size = size
+        self.count = count
+        self.channels = channels
+        self.allocated = 0 #the number of bitmaps this pool has created
+        self._free = deque()
+        if size is not None:
+            for i in range(count):
+                self._free.append(self._allocate())
+
+    def _allocate(self):
+        self.allocated += 1
+        return cv.CreateImage(self.size, cv.IPL_DEPTH_8U, self.channels)
+
+    def acquire(self, size):
+        """
+        Borrow a bitmap of the given size, allocating one only if none is free.
+        Changing the size drops the bitmaps of the old size.
+        """
+        if size != self.size:
+            self._free.clear()
+            self.size = size
+        try:
+            return self._free.pop()
+        except IndexError:
+            return self._allocate()
+
+    def release(self, bitmap):
+        """
+        Give a borrowed bitmap back to the pool.
+        """
+        if bitmap is not None and cv.GetSize(bitmap) == self.size:
+            self._free.append(bitmap)
+
+    def wrap(self, frame, camera=None):
+        """
+        Copy frame into a pooled bitmap and return it as a BGR Image.
+        """
+        bitmap = self.acquire(cv.GetSize(frame))
+        if frame.nChannels == self.channels:
+            cv.Copy(frame, bitmap)
+        else:
+            cv.Merge(frame, frame, frame, None, bitmap)
+        img = Image(camera=camera, colorSpace=ColorSpace.BGR)
+        img._bitmap = bitmap
+        img.width, img.height = cv.GetSize(bitmap)
+        img.depth = bitmap.depth
+        img._mPool = self
+        img._mPoolBitmap = bitmap
+        return img
+
+#keypoints and descriptors by (pixel digest, flavor, thresh, highQuality),
+#least recently used first, shared by every Image
+_keypointCache = OrderedDict()
+_keypointCacheLock = threading.Lock()
+
+def _keypointCacheGet(key):
+    _keypointCacheLock.acquire()
+    try:
+        retVal = _keypointCache.pop(key, None)
+        if retVal is not None:
+            _keypointCache[key] = retVal
+        return retVal
+    finally:
+        _keypointCacheLock.release()
+
+def _keypointCachePut(key, value):
+    _keypointCacheLock.acquire()
+    try:
+        _keypointCache.pop(key, None)
+        _keypointCache[key] = value
+        while len(_keypointCache) > max(init_options_handler.keypoint_cache_size, 0):
+            _keypointCache.popitem(last=False)
+    finally:
+        _keypointCacheLock.release()
+
 from SimpleCV.Features import FeatureSet, Feature, Barcode, Corner, HaarFeature, Line, Chessboard, TemplateMatch, BlobMaker, Circle, KeyPoint, Motion, KeypointMatch, FaceRecognizer
+from SimpleCV.Features.Detection import _templatePeaks, _suppressOverlaps
+from SimpleCV.Features.TemplateBank import TemplateBank
+from SimpleCV.Features.MotionField import MotionField, FlowEngine
+from SimpleCV.Features.KeypointIndex import KeypointIndex
 from SimpleCV.Tracking import camshiftTracker, lkTracker, surfTracker, mfTracker, TrackSet
 from SimpleCV.Stream import JpegStreamer
 from SimpleCV.Font import *
@@ -0,0 +1,295 @@
+from SimpleCV.base import *
+from SimpleCV.ImageClass import Image, ImageSet, _loadImage
+from SimpleCV.Features.FeatureExtractorBase import _extractorConfig
+from SimpleCV.Features.CachedFeatureExtractor import _imageDigest
+"""
+Routines shared by the orange based classifiers (KNN, SVM, NaiveBayes and
+Tree) for working on many images or feature vectors at once.
+"""
+
+def _featureVector(extractors, img):
+    """
+    Run every extractor on an image and join the results, or return None if
+    one of the extractors fails.
+    """
+    featureVector = []
+    for extractor in extractors:
+        feats = extractor.extract(img)
+        if( feats is None ):
+            return None
+        featureVector.extend(feats)
+    return featureVector
+
+
+def _extractBatch(extractors, images, workers=1):
+    """
+    The feature vectors of a list of images, in order, with None for the
+    images an extractor failed on. With workers > 1 the images are spread
+    over a pool of threads.
+    """
+    if workers > 1 and len(images) > 1:
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(lambda img: _featureVector(extractors, img), images)
+        finally:
+            pool.close()
+    return [_featureVector(extractors, img) for img in images]
+
+
+def _classifyFeatures(classifier, domain, classNames, features):
+    """
+    Classify a batch of feature vectors with one orange ExampleTable. Returns
+    an array of class names (None for rows that are None) and an array of
+    class probabilities with one column per class name.
+    """
+    labels = np.empty(len(features), dtype=object)
+    probabilities = np.empty((len(features), len(classNames)))
+    probabilities.fill(np.nan)
+    rows = []
+    valid = []
+    for i in range(len(features)):
+        if features[i] is None:
+            continue
+        #the class column has to be filled in, it is ignored when classifying
+        rows.append([float(v) for v in features[i]] + [classNames[0]])
+        valid.append(i)
+    if not rows:
+        return labels, probabilities
+    table = orange.ExampleTable(domain, rows)
+    for i, example in zip(valid, table):
+        (value, distribution) = classifier(example, orange.GetBoth)
+        labels[i] = str(value)
+        probabilities[i] = [distribution[c] for c in classNames]
+    return labels, probabilities
+
+
+class BatchClassifierMixin:
+    """
+    Batch training and classification for the orange based classifiers. The
+    classes that use it have mFeatureExtractors, mClassifier, mOrangeDomain,
+    mClassNames and mDataSetRaw, and _trainPath() and _trainImageSet() methods
+    that add one class's training data an image at a time.
+    """
+    def _trainClass(self, images, className, subset, disp, verbose, workers=1, cachedir=None):
+        """
+        Add the training data of one class, from a directory or an ImageSet,
+        and return the number of images added.
+
+        With workers > 1 the features are extracted by that many worker
+        processes, the results are the same but the images aren't shown on
+        disp. With a cachedir the feature vectors are kept in that directory
+        and reused when training again with the same feature extractors, see
+        FeatureCache. Otherwise the images are added one at a time by
+        _trainPath() or _trainImageSet().
+        """
+        if( workers <= 1 and cachedir is None ):
+            if( isinstance(images, str) ):
+                return self._trainPath(images, className, subset, disp, verbose)
+            return self._trainImageSet(images, className, subset, disp, verbose)
+        if( isinstance(images, str) ):
+            files = []
+            for ext in IMAGE_FORMATS:
+                files.extend(glob.glob(os.path.join(images, ext)))
+            images = files
+        if( subset > 0 ):
+            images = images[0:subset]
+        count = 0
+        for featureVector in _trainFeatures(self.mFeatureExtractors, images, workers, cachedir, verbose):
+            if( featureVector is not None ):
+                self.mDataSetRaw.append(list(featureVector) + [className])
+                count = count + 1
+        return count
+
+    def classifyBatch(self, images, workers=1):
+        """
+        Classify a list of images (or an ImageSet) at once. The features are
+        extracted for every image, using a pool of workers threads if workers
+        is more than one, and classified from a single table.
+
+        Returns a tuple of two arrays, the class name of every image and the
+        probability of every class (in the order of the class names) for every
+        image. Images the feature extractors fail on get None and NaNs.
+
+        >>> labels, probabilities = classifier.classifyBatch(ImageSet("parts/"))
+        """
+        features = _extractBatch(self.mFeatureExtractors, images, workers)
+        return self.classifyFeatures(features)
+
+    def classifyFeatures(self, features):
+        """
+        Classify feature vectors that were already extracted, one per row of a
+        list or 2D array, in the order the feature extractors produce them.
+        Returns the same (labels, probabilities) tuple as classifyBatch().
+        """
+        return _classifyFeatures(self.mClassifier, self.mOrangeDomain, self.mClassNames, features)
+
+
+class FeatureCache(object):
+    """
+    **SUMMARY**
+
+    An on disk cache of feature vectors. An entry is keyed by the
+    configuration of the feature extractors and by the path, size and
+    modification time of an image file, or by the pixels of an image that is
+    only in memory, so retraining a classifier with new parameters, or on a
+    few new images, only extracts the features it hasn't seen before.
+    Changing an extractor's settings or editing an image makes a new entry.
+
+    **EXAMPLE**
+
+    >>> svm = SVMClassifier([HueHistogramFeatureExtractor()])
+    >>> svm.train(paths, classes, workers=4, cachedir="./features/")
+
+    """
+    cachedir = None
+    config = None
+
+    def __init__(self, cachedir, extractors):
+        self.cachedir = cachedir
+        if not os.path.exists(cachedir):
+            os.makedirs(cachedir)
+        config = tuple([_extractorConfig(e) for e in extractors])
+        self.config = hashlib.md5(repr(config)).hexdigest()
+
+    def _file(self, source):
+        if isinstance(source, tuple):
+            (path, size) = source
+            st = os.stat(path)
+            key = "%s:%s:%d:%d:%s" % (os.path.abspath(path), str(size), st.st_size, int(st.st_mtime), self.config)
+        else:
+            key = "%s:%s" % (_imageDigest(source), self.config)
+        return os.path.join(self.cachedir, hashlib.md5(key).hexdigest() + ".pkl")
+
+    def get(self, source):
+        """
+        The cached feature vector of a (path, size) image file or of an
+        Image, or None.
+        """
+        try:
+            f = open(self._file(source), 'rb')
+        except (IOError, OSError):
+            return None
+        try:
+            return pickle.load(f)
+        except Exception:
+            return None
+        finally:
+            f.close()
+
+    def put(self, source, featureVector):
+        try:
+            fname = self._file(source)
+        except OSError:
+            return
+        #write then rename so a half written entry is never read
+        tmp = fname + "." + str(os.getpid())
+        f = open(tmp, 'wb')
+        pickle.dump(featureVector, f, 2)
+        f.close()
+        os.rename(tmp, fname)
+
+
+#the extractors of a training worker process, sent once by the pool initializer
+_workerExtractors = None
+
+def _initTrainWorker(extractors):
+    global _workerExtractors
+    _workerExtractors = extractors
+
+def _featureStores(extractors):
+    """
+    The FeatureStores of the CachedFeatureExtractors in a list of extractors,
+    each once, in order.
+    """
+    stores = []
+    for extractor in extractors:
+        store = getattr(extractor, 'mStore', None)
+        if store is not None and not [s for s in stores if s is store]:
+            stores.append(store)
+    return stores
+
+def _extractSource(source):
+    """
+    Load a (path, size) source in a worker process and extract its features.
+    Returns the feature vector and, for every FeatureStore of the worker's
+    extractors, the vectors it was given to put, which only the parent
+    process writes.
+    """
+    pending = []
+    try:
+        img = _loadImage(*source)
+    except Exception:
+        return None, pending
+    featureVector = _featureVector(_workerExtractors, img)
+    for store in _featureStores(_workerExtractors):
+        pending.append(store.pending)
+        store.pending = []
+    return featureVector, pending
+
+
+def _trainSources(images):
+    """
+    The sources to extract from for a list of file paths, a list of Images or
+    an ImageSet: (path, size) tuples for files, so they can be loaded and
+    cached by path, and Images for images that are only in memory.
+    """
+    if isinstance(images, ImageSet) and images.lazy:
+        return [(e, images._size) if isinstance(e, basestring) else e for e in list.__iter__(images)]
+    return [(e, None) if isinstance(e, basestring) else e for e in images]
+
+
+def _trainFeatures(extractors, images, workers=1, cachedir=None, verbose=False):
+    """
+    Extract the features of a list of training images, see _trainSources(),
+    in order, with None for the images an extractor failed on. Files are
+    loaded and extracted by a pool of workers processes, images in memory by
+    a pool of threads, and with a cachedir the vectors come from and go to a
+    FeatureCache.
+    """
+    sources = _trainSources(images)
+    cache = None
+    if cachedir is not None:
+        cache = FeatureCache(cachedir, extractors)
+    retVal = [None] * len(sources)
+    todo = []
+    for i in range(len(sources)):
+        source = sources[i]
+        if cache is not None:
+            cached = cache.get(source)
+            if cached is not None:
+                retVal[i] = cached
+                continue
+        if verbose:
+            name = source[0] if isinstance(source, tuple) else source.filename
+            print "Opening file: " + str(name)
+        todo.append(i)
+
+    files = [i for i in todo if isinstance(sources[i], tuple)]
+    loaded = [i for i in todo if not isinstance(sources[i], tuple)]
+    stores = _featureStores(extractors)
+    if workers > 1 and len(files) > 1:
+        #the workers get read only copies of the stores, see FeatureStore
+        for store in stores:
+            store.flush()
+        pool = multiprocessing.Pool(workers, _initTrainWorker, (extractors,))
+        try:
+            results = pool.map(_extractSource, [sources[i] for i in files])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _initTrainWorker(extractors)
+        results = [_extractSource(sources[i]) for i in files]
+    for i, (featureVector, pending) in zip(files, results):
+        retVal[i] = featureVector
+        for store, puts in zip(stores, pending):
+            for put in puts:
+                store.put(*put)
+        if cache is not None and featureVector is not None:
+            cache.put(sources[i], featureVector)
+    vectors = _extractBatch(extractors, [sources[i] for i in loaded], workers)
+    for i, featureVector in zip(loaded, vectors):
+        retVal[i] = featureVector
+        if cache is not None and featureVector is not None:
+            cache.put(sources[i], featureVector)
+    return retVal
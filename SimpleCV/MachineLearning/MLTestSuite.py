@@ -82,6 +82,13 @@ for i in range(10):
     img = Image(files[i])
     cname = classifierSVMP.classify(img)
     print(files[i]+' -> '+cname)
+print('Batch classify')
+batch = [Image(f) for f in files[0:10]]
+labels, probabilities = classifierSVMP.classifyBatch(batch, workers=2)
+for i in range(10):
+    print(files[i]+' -> '+labels[i]+' '+str(probabilities[i]))
+    if labels[i] != classifierSVMP.classify(batch[i]):
+        print('BATCH CLASSIFY MISMATCH')
 classifierSVMP.save('PolySVM.pkl')
 print('Reloading from file')
 testSVM = SVMClassifier.load('PolySVM.pkl')
@@ -283,6 +290,12 @@ for i in range(10):
     img = Image(files[i])
     cname = classifierKNN.classify(img)
     print(files[i]+' -> '+cname)
+print('Parallel train with a feature cache')
+for i in range(2): #the second run reads every vector from the cache
+    classifierKNNP = KNNClassifier(extractors)
+    classifierKNNP.train(path,classes,subset=n,workers=4,cachedir='knn_features')
+    if classifierKNNP.mDataSetRaw != classifierKNN.mDataSetRaw:
+        print('PARALLEL TRAIN MISMATCH')
 
 classifierKNN.save('knn.pkl')
 print('Reloading from file')
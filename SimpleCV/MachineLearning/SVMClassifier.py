@@ -2,6 +2,7 @@ from SimpleCV.base import *
 from SimpleCV.ImageClass import Image, ImageSet
 from SimpleCV.DrawingLayer import *
 from SimpleCV.Features import FeatureExtractorBase
+from SimpleCV.MachineLearning.ClassifierUtils import BatchClassifierMixin
 """
 This class is encapsulates almost everything needed to train, test, and deploy a
 multiclass support vector machine for an image classifier. Training data should
@@ -17,7 +18,7 @@ is as follows.
 7. Save the classifier.
 8. Deploy using the classify method.
 """
-class SVMClassifier:
+class SVMClassifier(BatchClassifierMixin):
     """
     This class encapsulates a Naive Bayes Classifier.
     See:
@@ -155,7 +156,6 @@ class SVMClassifier:
         c = self.mClassifier(test[0]) #classify
         return str(c) #return to class name
 
-
     def setFeatureExtractors(self, extractors):
         """
         Add a list of feature extractors to the classifier. These feature extractors
@@ -228,7 +228,7 @@ class SVMClassifier:
             del img
         return count
 
-    def train(self,images,classNames,disp=None,subset=-1,savedata=None,verbose=True):
+    def train(self,images,classNames,disp=None,subset=-1,savedata=None,verbose=True,workers=1,cachedir=None):
         """
         Train the classifier.
         images paramater can take in a list of paths or a list of imagesets
@@ -247,16 +247,17 @@ class SVMClassifier:
         name we save the data to a tab delimited file.
 
         verbose - print confusion matrix and file names
+
+        workers, cachedir - extract the features with worker processes and keep
+        them in a cache directory, see BatchClassifierMixin._trainClass().
+
         returns [%Correct %Incorrect Confusion_Matrix]
         """
         count = 0
         self.mClassNames = classNames
         # fore each class, get all of the data in the path and train
         for i in range(len(classNames)):
-            if ( isinstance(images[i], str) ):
-                count = count + self._trainPath(images[i],classNames[i],subset,disp,verbose)
-            else:
-                count = count + self._trainImageSet(images[i],classNames[i],subset,disp,verbose)
+            count = count + self._trainClass(images[i],classNames[i],subset,disp,verbose,workers,cachedir)
 
         colNames = []
         for extractor in self.mFeatureExtractors:
@@ -45,28 +45,28 @@ class JpegStreamHandler(SimpleHTTPRequestHandler):
             self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=--BOUNDARYSTRING")
             self.end_headers()
             (host, port) = self.server.socket.getsockname()[:2]
+            streamer = _jpegstreamers[port]
 
 
-            count = 0
+            #the thread sleeps until a new frame is published, and always
+            #sends the newest one, so a slow client skips frames instead of
+            #holding up the others
             timeout = 0.75
-            lasttimeserved = 0
-            while (1):
-                if (_jpegstreamers[port].refreshtime > lasttimeserved or time.time() - timeout > lasttimeserved):
+            lastserved = -1
+            streamer._addClient()
+            try:
+                while (1):
+                    (lastserved, chunk) = streamer.waitFrame(lastserved, timeout)
+                    if chunk is None:
+                        continue
                     try:
-                        self.wfile.write("--BOUNDARYSTRING\r\n")
-                        self.send_header("Content-type", "image/jpeg")
-                        self.send_header("Content-Length", str(len(_jpegstreamers[port].jpgdata.getvalue())))
-                        self.end_headers()
-                        self.wfile.write(_jpegstreamers[port].jpgdata.getvalue() + "\r\n")
-                        lasttimeserved = time.time()
+                        self.wfile.write(chunk)
                     except socket.error, e:
                         return
                     except IOError, e:
                         return
-                    count = count + 1
-
-
-                time.sleep(_jpegstreamers[port].sleeptime)
+            finally:
+                streamer._removeClient()
 
 
 
@@ -99,10 +99,13 @@ class JpegStreamer():
 
     Note 3 optional parameters on the constructor:
     - port (default 8080) which sets the TCP port you need to connect to
-    - sleep time (default 0.1) how often to update.  Above 1 second seems to cause dropped connections in Google chrome
+    - sleep time (default 0.1) kept for backwards compatibility, clients are
+      now woken as soon as a new frame is published
 
 
-    Once initialized, the buffer and sleeptime can be modified and will function properly -- port will not.
+    Each frame is JPEG encoded once and the same bytes are sent to every
+    connected browser. A client that can't keep up skips to the newest frame
+    rather than slowing down the others; clients() returns how many are connected.
     """
     server = ""
     host = ""
@@ -111,6 +114,9 @@ class JpegStreamer():
     framebuffer = ""
     counter = 0
     refreshtime = 0
+    jpgdata = None
+    frameid = 0
+    _chunk = None #the multipart part sent to the clients, built once per frame
 
 
     def __init__(self, hostandport = 8080, st=0.1 ):
@@ -126,6 +132,9 @@ class JpegStreamer():
 
 
         self.sleeptime = st
+        self.jpgdata = StringIO()
+        self._condition = threading.Condition()
+        self._clients = 0
         self.server = JpegTCPServer((self.host, self.port), JpegStreamHandler)
         self.server_thread = threading.Thread(target = self.server.serve_forever)
         _jpegstreamers[self.port] = self
@@ -134,6 +143,65 @@ class JpegStreamer():
         self.framebuffer = self #self referential, ugh.  but gives some bkcompat
 
 
+    def publish(self, data):
+        """
+        Send a JPEG encoded frame (a string) to every connected client. This is
+        called by Image.save(js).
+        """
+        chunk = "".join(["--BOUNDARYSTRING\r\n",
+                         "Content-type: image/jpeg\r\n",
+                         "Content-Length: %d\r\n\r\n" % len(data),
+                         data, "\r\n"])
+        self._condition.acquire()
+        try:
+            self.jpgdata = StringIO(data)
+            self._chunk = chunk
+            self.frameid += 1
+            self.counter += 1
+            self.refreshtime = time.time()
+            self._condition.notifyAll()
+        finally:
+            self._condition.release()
+
+
+    def waitFrame(self, lastid, timeout = 0.75):
+        """
+        Block until a frame newer than lastid is published, returns (frameid, chunk)
+        where chunk is the multipart part to send. After timeout seconds the
+        current frame is returned again, which keeps browsers from dropping
+        the connection, or (lastid, None) if nothing has been published yet.
+        """
+        self._condition.acquire()
+        try:
+            #nothing published yet counts as no new frame, so clients wait
+            if self.frameid == lastid or self._chunk is None:
+                self._condition.wait(timeout)
+            if self._chunk is None:
+                return (lastid, None)
+            return (self.frameid, self._chunk)
+        finally:
+            self._condition.release()
+
+
+    def clients(self):
+        """
+        Returns the number of clients watching the stream.
+        """
+        return self._clients
+
+
+    def _addClient(self):
+        self._condition.acquire()
+        self._clients += 1
+        self._condition.release()
+
+
+    def _removeClient(self):
+        self._condition.acquire()
+        self._clients -= 1
+        self._condition.release()
+
+
     def url(self):
         """
         Returns the JpegStreams Webbrowser-appropriate URL, if not provided in the constructor, it defaults to "http://localhost:8080"
@@ -150,6 +218,47 @@ class JpegStreamer():
 
 
 
+class VideoWriterThread(threading.Thread):
+    """
+    **SUMMARY**
+
+    The encoder thread of an asynchronous VideoStream. It takes frames off
+    the stream's queue and writes them, so a slow codec never holds up the
+    thread that is capturing.
+
+    """
+    stream = None
+
+    def __init__(self, stream):
+        super(VideoWriterThread, self).__init__()
+        self.stream = stream
+        self.daemon = True
+        self.name = 'Thread-VideoStream-' + stream.filename
+
+    def run(self):
+        vs = self.stream
+        while True:
+            vs._condition.acquire()
+            try:
+                while not vs._queue and not vs._closing:
+                    vs._condition.wait()
+                if not vs._queue:
+                    return
+                (realtime, img) = vs._queue.popleft()
+                vs._busy = True
+                vs._condition.notifyAll() #wake a writer blocked on a full queue
+            finally:
+                vs._condition.release()
+            try:
+                vs._writeFrame(img, realtime)
+            finally:
+                vs._condition.acquire()
+                vs.written += 1
+                vs._busy = False
+                vs._condition.notifyAll()
+                vs._condition.release()
+
+
 class VideoStream():
     """
     The VideoStream lets you save video files in a number of different formats.
@@ -182,6 +291,20 @@ class VideoStream():
 
 
         my_camera.getImage().save(vs)
+
+
+    To keep a slow codec from stalling your capture loop, make the stream
+    threaded. Frames are then put on a queue and encoded by a separate
+    thread::
+
+
+        vs = VideoStream("myvideo.avi", threaded=True, queuesize=64, droppolicy="oldest")
+
+
+    When the queue is full droppolicy decides what happens: "oldest" throws
+    away the oldest queued frame, "newest" throws away the frame being saved,
+    and "block" waits for the encoder. queueDepth() and the dropped counter
+    tell you how it is keeping up, and close() writes out what is left.
     """
 
 
@@ -193,14 +316,32 @@ class VideoStream():
     videotime = 0.0
     starttime = 0.0
     framecount = 0
+    threaded = False
+    queuesize = 32
+    droppolicy = "oldest"
+    dropped = 0
+    written = 0
+    _thread = None
 
 
-    def __init__(self, filename, fps = 25, framefill = True):
+    def __init__(self, filename, fps = 25, framefill = True, threaded = False, queuesize = 32, droppolicy = "oldest"):
         (revextension, revname) = filename[::-1].split(".")
         extension = revextension[::-1]
         self.filename = filename
         self.fps = fps
         self.framefill = framefill
+        if droppolicy not in ("oldest", "newest", "block"):
+            logger.warning("VideoStream: unknown droppolicy " + str(droppolicy) + ", using oldest")
+            droppolicy = "oldest"
+        self.threaded = threaded
+        self.queuesize = max(int(queuesize), 1)
+        self.droppolicy = droppolicy
+        self.dropped = 0
+        self.written = 0
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._busy = False
         #if extension == "mpg":
         self.fourcc = cv.CV_FOURCC('I', 'Y', 'U', 'V')
             #self.fourcc = 0
@@ -222,15 +363,88 @@ class VideoStream():
         use this function to save just the bitmap as well so
         image markup is not implicit,typically you use image.save() but
         this allows for more finer control
+
+        On a threaded stream a copy of the frame is queued, so the image can
+        be drawn on or reused straight away, and this returns without waiting
+        for the encoder, unless the queue is full and droppolicy is "block".
+        """
+        realtime = time.time()
+        if self._closing:
+            logger.warning("VideoStream: writeFrame called on a closed stream")
+            return
+        if not self.threaded:
+            self._writeFrame(img, realtime)
+            return
+
+        #copied before taking the lock, so writers don't wait on each other's copies
+        img = img.copy()
+        self._condition.acquire()
+        try:
+            if self._closing:
+                logger.warning("VideoStream: writeFrame called on a closed stream")
+                return
+            if self._thread is None:
+                self._thread = VideoWriterThread(self)
+                self._thread.start()
+            if len(self._queue) >= self.queuesize:
+                if self.droppolicy == "newest":
+                    self.dropped += 1
+                    return
+                elif self.droppolicy == "oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._queue) >= self.queuesize:
+                        self._condition.wait()
+            self._queue.append((realtime, img))
+            self._condition.notifyAll()
+        finally:
+            self._condition.release()
+
+
+    def queueDepth(self):
+        """
+        Returns the number of frames waiting to be encoded on a threaded stream.
         """
+        return len(self._queue)
+
+
+    def flush(self):
+        """
+        Wait until every queued frame has been written.
+        """
+        self._condition.acquire()
+        try:
+            while self._queue or self._busy:
+                self._condition.wait()
+        finally:
+            self._condition.release()
+
+
+    def close(self):
+        """
+        Write out the queued frames, stop the encoder thread and release the
+        video file.  Frames saved after this are ignored.
+        """
+        self._condition.acquire()
+        self._closing = True
+        self._condition.notifyAll()
+        self._condition.release()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.writer = None
+
+
+    def _writeFrame(self, img, realtime):
         if not self.writer:
             self.initializeWriter(img.size())
+            self.starttime = realtime
             self.lastframe = img
 
 
         frametime = 1.0 / float(self.fps)
         targettime = self.starttime + frametime * self.framecount
-        realtime = time.time()
         if self.framefill:
             #see if we need to do anything to adjust to real time
             if (targettime > realtime + frametime):
@@ -14,6 +14,9 @@ import threading
 import tempfile
 import zipfile
 import pickle
+import hashlib #for cache keys
+import atexit
+import weakref
 import glob #for directory scanning
 import abc #abstract base class
 import colorsys
@@ -34,6 +37,9 @@ import copy
 import types
 import time
 import itertools #for track
+from collections import OrderedDict, deque #for LRU caches and prefetch queues
+import multiprocessing #for parallel decoding
+from multiprocessing.pool import ThreadPool
 
 from numpy import linspace
 from scipy.interpolate import UnivariateSpline
@@ -127,6 +133,8 @@ class InitOptionsHandler(object):
     def __init__(self):
         self.on_notebook = False
         self.headless = False
+        self.shared_buffers = False
+        self.keypoint_cache_size = 0
 
     def enable_notebook(self):
         self.on_notebook = True
@@ -137,6 +145,19 @@ class InitOptionsHandler(object):
         os.environ["SDL_VIDEODRIVER"] = "dummy"
         self.headless = True
 
+    def set_shared_buffers(self, enabled=True):
+        # Images created while this is on keep their pixels in a single
+        # contiguous BGR numpy array; the bitmap, matrix and numpy accessors
+        # hand out headers / views over it instead of copies.
+        self.shared_buffers = enabled
+
+    def set_keypoint_cache_size(self, size):
+        # The number of keypoint results, one per image content and detector
+        # settings, shared by every Image in the process. 0, the default,
+        # turns it off: every image looked up is hashed, which is wasted on
+        # live camera frames, so turn it on for reloaded or reused templates.
+        self.keypoint_cache_size = size
+
 init_options_handler = InitOptionsHandler()
 
 try:
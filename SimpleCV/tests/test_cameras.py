@@ -41,3 +41,19 @@ def test_camera_multiple_instances():
     if not cam3 or not img3:
         assert False
     pass
+
+def test_camera_ring_buffer():
+    mycam = Camera(0, buffersize=8)
+    start = time.time()
+    img = mycam.getImage()
+    time.sleep(0.5)
+    frames = mycam.getFrames(since=start)
+    if not img or not frames or len(frames) > 8:
+        assert False
+    times = [f.capturetime for f in frames]
+    assert times == sorted(times)
+    assert mycam.getFrames(since=times[-1]) == [] or mycam.getFrames(since=times[-1])[0].capturetime > times[-1]
+    #getImage() hands out a copy, the buffered frames stay as captured
+    img = mycam.getImage()
+    assert not [f for f in mycam.getFrames() if f is img]
+    pass
@@ -146,3 +146,19 @@ def test_screenshot():
         assert True
     else:
         assert False
+
+def test_classify_batch_matches_classify():
+    if not ORANGE_ENABLED:
+        return
+    reds = ImageSet()
+    blues = ImageSet()
+    for fname in [testimage, testimage2, testimageclr, logo]:
+        img = Image(fname).resize(64, 64)
+        reds.append(img.colorDistance(Color.RED))
+        blues.append(img.colorDistance(Color.BLUE).invert())
+    classifier = KNNClassifier([HueHistogramFeatureExtractor(), EdgeHistogramFeatureExtractor()])
+    classifier.train([reds, blues], ['red', 'blue'], verbose=False)
+    imgs = list(reds) + list(blues)
+    labels, probabilities = classifier.classifyBatch(imgs, workers=2)
+    assert list(labels) == [classifier.classify(i) for i in imgs]
+    assert probabilities.shape == (len(imgs), 2)
@@ -9,7 +9,7 @@
 # test_detection_lines().  This makes it easier to verify visually
 # that all the correct test per operation exist
 
-import os, sys, pickle, operator
+import os, sys, pickle, operator, tempfile
 from SimpleCV import *
 from nose.tools import with_setup, nottest
 
@@ -3981,3 +3981,545 @@ def test_drawingLayerToSVG():
         pass
     else:
         assert False
+
+def test_image_shared_buffers():
+    init_options_handler.set_shared_buffers()
+    try:
+        img = Image(testimageclr)
+        store = img.getNumpyCv2()
+        assert store.flags['C_CONTIGUOUS']
+        assert np.may_share_memory(img.getNumpy(), store)
+        assert not img.getNumpy().flags.writeable
+        assert img.size() == (store.shape[1], store.shape[0])
+        img[0, 0] = Color.RED
+        assert tuple(store[0, 0]) == (0, 0, 255)
+        assert tuple(img.getNumpy()[0, 0]) == Color.RED
+        assert img.getGrayNumpy().shape == (img.width, img.height)
+        inv = img.invert()
+        assert tuple(inv.getNumpy()[0, 0]) == (0, 255, 255)
+    finally:
+        init_options_handler.set_shared_buffers(False)
+
+def test_image_derived_buffers():
+    img = Image((20, 20))
+    e1 = img._getEdgeMap()
+    gray = img.getGrayNumpy()
+    assert img._getEdgeMap() is e1
+    assert img.getGrayNumpy() is gray
+    dft = img.rawDFTImage(grayscale=True)
+    assert np.max(gray) == 0
+
+    img[5:15, 5:15] = Color.WHITE
+    assert img._getEdgeMap() is not e1
+    assert np.max(img.getGrayNumpy()) == 255
+    assert img.rawDFTImage(grayscale=True)[0] is not dft[0]
+
+    img2 = Image(testimageclr)
+    img2.getPalette(bins=4)
+    gen = img2._mPaletteGen
+    cv.SetZero(img2.getBitmap())
+    img2.markDirty()
+    assert np.max(img2.getGrayNumpy()) == 0
+    img2.getPalette(bins=4)
+    assert img2._mPaletteGen != gen
+
+def test_imageset_lazy():
+    iset = ImageSet("../sampleimages/", lazy=True, cacheSize=4)
+    eager = ImageSet("../sampleimages/")
+    assert len(iset) == len(eager)
+    assert len(iset._cache) == 0
+    dims = iset.dimensions()
+    assert dims.shape == (len(iset), 2)
+    img = iset[3]
+    assert isinstance(img, Image)
+    assert img.size() == tuple(dims[3])
+    assert iset[3] is img
+    count = 0
+    for i in iset[0:10]:
+        count = count + 1
+        assert len(iset._cache) <= 4
+    assert count == 10
+    small = iset[0:6].standardize(32, 24)
+    assert small.lazy
+    assert np.all(small.dimensions() == (32, 24))
+    assert small[2].size() == (32, 24)
+    avg = small.average()
+    assert avg.size() == (32, 24)
+    assert isinstance(iset.getEXIFData(0), dict)
+
+def test_imageset_prefetch():
+    iset = ImageSet("../sampleimages/", lazy=True, cacheSize=2)
+    names = [img.filename for img in iset.prefetch(depth=4, workers=3)]
+    assert names == [iset[i].filename for i in range(len(iset))]
+    eager = ImageSet()
+    eager.load("../sampleimages/", "png", workers=4)
+    serial = ImageSet()
+    serial.load("../sampleimages/", "png")
+    assert [i.filename for i in eager] == [i.filename for i in serial]
+
+def test_image_set_average_workers():
+    iset = ImageSet()
+    for i in range(10):
+        iset.append(Image("./../sampleimages/tracktest%d.jpg" % i))
+    avg = iset.average()
+    avg2 = iset.average(workers=3)
+    expected = np.mean([i.getNumpy().astype(np.float64) for i in iset], axis=0)
+    assert np.max(np.abs(avg.getNumpy() - np.around(expected))) <= 1
+    assert np.max(np.abs(avg.getNumpy().astype(int) - avg2.getNumpy())) <= 1
+    lazy = ImageSet([i.filename for i in iset], lazy=True, cacheSize=1)
+    avg3 = lazy.average(workers=2)
+    assert avg3.size() == avg.size()
+    assert len(ImageSet().average()) == 0
+    assert len(ImageSet().average(workers=3)) == 0
+
+def test_frame_pool():
+    src = Image(testimageclr)
+    pool = FramePool(size=src.size(), count=2)
+    assert pool.allocated == 2
+    img = pool.wrap(src.getBitmap())
+    assert img.size() == src.size()
+    assert np.all(img.getNumpy() == src.getNumpy())
+    bitmap = img.getBitmap()
+    del img
+    img2 = pool.wrap(src.getBitmap())
+    assert img2.getBitmap() is bitmap
+    assert pool.allocated == 2
+
+def test_jpegstreamer_fanout():
+    js = JpegStreamer(8093)
+    #before the first frame clients wait instead of spinning
+    start = time.time()
+    assert js.waitFrame(-1, 0.2) == (-1, None)
+    assert time.time() - start >= 0.15
+    img = Image(testimage)
+    img.save(js)
+    data = js.jpgdata.getvalue()
+    assert js.frameid == 1
+    (frameid, chunk) = js.waitFrame(0, 0.01)
+    assert frameid == 1
+    assert chunk.endswith(data + "\r\n")
+    clients = []
+    for i in range(3):
+        sock = socket.create_connection(("localhost", 8093))
+        sock.sendall("GET /stream HTTP/1.0\r\n\r\n")
+        clients.append(sock)
+    for sock in clients:
+        received = ""
+        while data not in received:
+            received += sock.recv(65536)
+    assert js.clients() == 3
+    for sock in clients:
+        sock.close()
+
+def test_videostream_threaded():
+    outfile = os.path.join(tempfile.mkdtemp(), "threaded.avi")
+    vs = VideoStream(outfile, fps=25, framefill=False, threaded=True, queuesize=2, droppolicy="newest")
+    img = Image(testimage)
+    for i in range(20):
+        img.save(vs)
+    vs.flush()
+    assert vs.queueDepth() == 0
+    assert vs.written + vs.dropped == 20
+    vs.close()
+    assert os.path.isfile(outfile)
+    vs = VideoStream(outfile, fps=25, framefill=False, threaded=True, queuesize=2, droppolicy="block")
+    for i in range(10):
+        img.save(vs)
+    vs.writeFrame(img)
+    vs.close()
+    assert vs.dropped == 0
+    assert vs.written == 11
+    #the stream encoded a copy of the frame, not the caller's image
+    assert vs.lastframe is not img
+    #frames saved after close() are ignored, threaded or not
+    vs.writeFrame(img)
+    assert vs.written == 11
+    vs = VideoStream(outfile, fps=25, framefill=False)
+    vs.writeFrame(img)
+    vs.close()
+    vs.writeFrame(img)
+    assert vs.writer is None and vs.framecount == 1
+
+def test_detection_blobs_table():
+    img = Image(testbarcode)
+    table = img.findBlobs(output="table")
+    blobs = img.findBlobs()
+    assert len(table) > 0
+    assert abs(len(table) - len(blobs)) <= len(blobs) / 2
+    assert np.all(np.diff(table.area) <= 0)
+    x, y, w, h = table.bbox[0]
+    cx, cy = table.centroid[0]
+    assert x <= cx <= x + w and y <= cy <= y + h
+    assert np.sum(table.mask(0).getGrayNumpy() > 0) == table.area[0]
+    assert len(table.contour(0)) > 0
+    small = table[table.area < 50]
+    assert len(small) == np.sum(table.area < 50)
+    assert table.meanColor.shape == (len(table), 3)
+
+def test_blob_lazy_attributes():
+    img = Image("../sampleimages/blockhead.png")
+    blobs = BlobMaker().extract(img)
+    b = blobs[0]
+    for name in ('mConvexHull', 'mAvgColor', 'mContourAppx', 'mMask'):
+        assert name not in b.__dict__
+    assert len(b.hull()) >= 3
+    assert 'mConvexHull' in b.__dict__
+    assert 'mAvgColor' not in b.__dict__
+    holes = sum([len(x.mHoleContour) for x in blobs if x.mHoleContour is not None])
+    assert holes == 7
+    copied = pickle.loads(pickle.dumps(b))
+    assert copied.seq is None
+    assert list(copied.mAvgColor) == list(b.mAvgColor)
+    assert copied.mHoleContour == b.mHoleContour
+
+def test_blob_maker_contour_tree():
+    img = Image("../sampleimages/blockhead.png")
+    blobber = BlobMaker()
+    first = blobber.extract(img)
+    second = blobber.extract(img)
+    assert len(first) == len(second) == 7
+    assert [b.mArea for b in first] == [b.mArea for b in second]
+    assert first[0].mContour == second[0].mContour
+    binary = img.binarize().invert()
+    seq = cv.FindContours(binary._getGrayscaleBitmap(), blobber.mMemStorage, cv.CV_RETR_TREE, cv.CV_CHAIN_APPROX_SIMPLE)
+    (seqs, parent, firstChild, nextSibling, depth) = blobber._contourTree(seq)
+    for i in range(len(seqs)):
+        if firstChild[i] >= 0:
+            assert parent[firstChild[i]] == i
+            assert depth[firstChild[i]] == depth[i] + 1
+        if nextSibling[i] >= 0:
+            assert parent[nextSibling[i]] == parent[i]
+    cv.ClearMemStorage(blobber.mMemStorage)
+
+def test_template_match_suppression():
+    from SimpleCV.Features.Detection import _suppressOverlaps
+    source = Image("../sampleimages/templatetest.png")
+    template = Image("../sampleimages/template.png")
+    raw = source.findTemplate(template, threshold=2, rawmatches=True)
+    fs = source.findTemplate(template, threshold=2)
+    assert 0 < len(fs) <= len(raw)
+    for i in range(len(fs)):
+        for j in range(i + 1, len(fs)):
+            assert (abs(fs[i].x - fs[j].x) >= template.width or
+                    abs(fs[i].y - fs[j].y) >= template.height)
+    keep = _suppressOverlaps([(0, 0, 10, 10), (5, 5, 10, 10), (20, 0, 10, 10)], np.array([0.5, 0.1, 0.3]), 1)
+    assert list(keep) == [1, 2]
+
+def test_template_bank():
+    source = Image("../sampleimages/templatetest.png")
+    template = Image("../sampleimages/template.png")
+    single = source.findTemplateOnce(template)
+    bank = TemplateBank([template, template.flipHorizontal()], scales=[0.9, 1.0])
+    assert len(bank) == 2
+    best = source.findTemplateOnce(bank)
+    first = [m for m in best if m.template_index == 0][0]
+    assert first.scale == 1.0
+    assert (first.x, first.y) == (single[0].x, single[0].y)
+    assert abs(first.quality - single[0].quality) < 1e-3
+    fs = source.findTemplate(bank, threshold=2)
+    assert len(fs) > 0
+    assert set([m.template_index for m in fs]) <= set([0, 1])
+    fs = source.findTemplate([template], threshold=2, scales=[1.0])
+    assert len(fs) == len(source.findTemplate(template, threshold=2))
+    #only the transforms for the last image size are kept, or none at all
+    bank.matchOnce(source.resize(source.width/2, source.height/2))
+    assert [e["spectra"][0] for e in bank._entries if e["spectra"] is not None] == [(source.height/2, source.width/2)] * 4
+    nocache = TemplateBank([template], cachespectra=False)
+    assert len(nocache.matchOnce(source)) == 1
+    assert nocache._entries[0]["spectra"] is None
+
+def test_template_scales_single_template():
+    source = Image("../sampleimages/templatetest.png")
+    template = Image("../sampleimages/template.png")
+    fs = source.findTemplate(template, threshold=2, scales=[0.9, 1.0, 1.1])
+    assert len(fs) > 0
+    assert set([m.template_index for m in fs]) == set([0])
+    assert set([m.scale for m in fs]) <= set([0.9, 1.0, 1.1])
+    best = source.findTemplateOnce(template, scales=[0.9, 1.0, 1.1])
+    assert len(best) == 1
+
+def test_haarlike_extract_batch():
+    haar = HaarLikeFeatureExtractor(fname="../Features/haar.txt")
+    img = Image(testimage)
+    regular = img.integralImage()
+    expected = [f.apply(regular) for f in haar.mFeatureSet]
+    feats = haar.extract(img)
+    assert len(feats) == 2 * len(expected)
+    assert np.allclose(feats[:len(expected)], expected)
+    imgs = [img, Image("lenna"), img.invert()]
+    batch = haar.extractBatch(imgs)
+    assert batch.shape == (3, len(feats))
+    for i in range(len(imgs)):
+        assert np.allclose(batch[i], haar.extract(imgs[i]))
+    #the lazily built tables are not part of the pickled state
+    fresh = HaarLikeFeatureExtractor(fname="../Features/haar.txt")
+    assert pickle.dumps(haar, 2) == pickle.dumps(fresh, 2)
+
+def test_cached_feature_extractor():
+    from SimpleCV.Features.CachedFeatureExtractor import _imageDigest
+    cachedir = tempfile.mkdtemp()
+    hue = CachedFeatureExtractor(HueHistogramFeatureExtractor(), cachedir)
+    img = Image(testimage)
+    expected = HueHistogramFeatureExtractor().extract(img)
+    assert np.allclose(hue.extract(img), expected)
+    assert np.allclose(hue.extract(img), expected)
+    assert hue.getFieldNames() == HueHistogramFeatureExtractor().getFieldNames()
+    hue.mStore.flush()
+    #a new store on the same directory finds the vector without extracting
+    store = FeatureStore(cachedir)
+    assert np.allclose(store.get(hue.mKey, hue.getNumFields(), _imageDigest(img)), expected)
+    other = CachedFeatureExtractor(HueHistogramFeatureExtractor(mNBins=8), store)
+    assert other.mKey != hue.mKey
+    assert len(other.extract(img)) == 8
+    #a full table drops the least recently used vector
+    small = FeatureStore(tempfile.mkdtemp(), maxentries=2)
+    imgs = [img, img.invert(), img.flipHorizontal()]
+    for i in imgs:
+        small.put(hue.mKey, 16, _imageDigest(i), expected)
+    assert small.get(hue.mKey, 16, _imageDigest(imgs[0])) is None
+    assert small.get(hue.mKey, 16, _imageDigest(imgs[2])) is not None
+
+def test_bof_generate_minibatch():
+    checkpoint = os.path.join(tempfile.mkdtemp(), "codebook.npz")
+    bof = BOFFeatureExtractor()
+    bof.generate(["../sampleimages/"], numcodes=16, sz=(11,11), imgs_per_dir=3, img_layout=(4,4),
+                 verbose=False, batchsize=500, checkpoint=checkpoint)
+    assert bof.mCodebook.shape == (16, 121)
+    assert os.path.exists(checkpoint)
+    assert len(bof.extract(Image(testimage))) == 16
+    #another pass carries on from the checkpoint
+    resumed = BOFFeatureExtractor()
+    resumed.generate(["../sampleimages/"], numcodes=16, sz=(11,11), imgs_per_dir=3, img_layout=(4,4),
+                     verbose=False, batchsize=500, passes=2, checkpoint=checkpoint, resume=True)
+    assert resumed.mCodebook.shape == (16, 121)
+    #resuming from the codebook in memory, a large prior keeps it in place
+    before = np.array(bof.mCodebook)
+    bof.generate(["../sampleimages/"], numcodes=16, sz=(11,11), imgs_per_dir=3, img_layout=(4,4),
+                 verbose=False, batchsize=500, resume=True, prior=1e9)
+    assert np.max(np.abs(bof.mCodebook - before)) < 1e-3
+
+def test_bof_nearest_codes():
+    from SimpleCV.Features.BOFFeatureExtractor import _nearestCodes
+    data = np.random.rand(500, 121) * 255
+    codebook = np.random.rand(32, 121) * 255
+    expected = np.argmin(spsd.cdist(data, codebook), axis=1)
+    assert np.all(_nearestCodes(data, codebook) == expected)
+    assert np.all(_nearestCodes(data, codebook, maxsize=100) == expected)
+    bof = BOFFeatureExtractor(numcodes=32, imglayout=(4,8))
+    bof.mCodebook = codebook
+    imgs = [Image(testimage), Image("lenna")]
+    batch = bof.extractBatch(imgs)
+    assert batch.shape == (2, 32)
+    for i in range(len(imgs)):
+        assert np.allclose(batch[i], bof.extract(imgs[i]))
+
+def test_color_colormap_lut():
+    img = Image(testimage)
+    cm = ColorModel()
+    cm.add(img.crop(0, 0, 20, 20))
+    cm.add((255,0,0))
+    cm.remove((255,0,0))
+    assert not cm.contains((255,0,0))
+    rs = np.right_shift(img.getNumpy(), cm.mBits).reshape(-1, 3)
+    expected = np.array([cm.mData.has_key(p.tostring()) for p in rs])
+    result = cm.threshold(img).getGrayNumpy().reshape(-1)
+    assert np.all((result == 0) == expected)
+    #a model read back from its dict builds the same table
+    cm2 = ColorModel()
+    cm2.mData = dict(cm.mData)
+    assert np.all(cm2._getLUT() == cm._getLUT())
+    #remove() on a model whose table isn't built yet agrees with its dict
+    cm.add((10,200,30))
+    fname = os.path.join(tempfile.mkdtemp(), "model.pkl")
+    cm.save(fname)
+    cm3 = ColorModel()
+    cm3.load(fname)
+    cm3.remove((10,200,30))
+    assert not cm3.contains((10,200,30))
+    cm2.mData = dict(cm3.mData)
+    cm2.mLUT = None
+    assert np.all(cm2._getLUT() == cm3._getLUT())
+    cm3.reset()
+    cm3.remove(Color.BLACK)
+    assert cm3.contains(Color.BLACK) and len(cm3.mData) == 1
+    assert cm3._getLUT().sum() == 1
+
+def _loopFlowSamples(engine, img, xa, ya):
+    """
+    The (x, y, dx, dy) flow samples of a FlowEngine's result buffers, found
+    one grid cell at a time.
+    """
+    window = engine.window
+    samples = []
+    if engine.method == "BM":
+        if engine._version == 0:
+            shift = int(window*1.2)
+        else:
+            shift = int(window*0.2)
+        (hv, wv) = xa.shape
+        for x in range(wv):
+            for y in range(hv):
+                samples.append((shift*x + window, shift*y + window, xa[y, x], ya[y, x]))
+        return np.array(samples, dtype=np.float64)
+    w = int(math.floor(window/2.0))
+    cx = ((img.width-window)/window)+1
+    cy = ((img.height-window)/window)+1
+    for x in range(cx):
+        for y in range(cy):
+            xi = x*window + w
+            yi = y*window + w
+            if engine.aggregate:
+                vx = np.average(xa[yi-w:yi+w, xi-w:xi+w])
+                vy = np.average(ya[yi-w:yi+w, xi-w:xi+w])
+            else:
+                vx = xa[yi, xi]
+                vy = ya[yi, xi]
+            samples.append((xi, yi, vx, vy))
+    return np.array(samples, dtype=np.float64)
+
+def test_movement_dense_field():
+    current = Image("../sampleimages/flow_simple1.png")
+    prev = Image("../sampleimages/flow_simple2.png")
+    #the vectorized sampling matches a loop over the grid, as findMotion used to do
+    for method, aggregate in [("BM", True), ("HS", True), ("LK", True), ("LK", False)]:
+        engine = FlowEngine(method=method, window=7, aggregate=aggregate)
+        field = engine.compute(current, prev)
+        (xf, yf) = engine._buffers.values()[0]
+        expected = _loopFlowSamples(engine, current, np.asarray(cv.GetMat(xf)), np.asarray(cv.GetMat(yf)))
+        assert len(field) == len(expected) > 0
+        assert field.x.shape == field.dx.shape
+        assert np.allclose(field.x.T.ravel(), expected[:, 0])
+        assert np.allclose(field.y.T.ravel(), expected[:, 1])
+        assert np.allclose(field.dx.T.ravel(), expected[:, 2], atol=1e-4)
+        assert np.allclose(field.dy.T.ravel(), expected[:, 3], atol=1e-4)
+        assert np.max(np.hypot(field.norm_dx, field.norm_dy)) <= 1.0 + 1e-6
+        fs = field.toFeatureSet()
+        assert np.allclose([f.dx for f in fs], expected[:, 2], atol=1e-4)
+    #the block means against a loop over the cells
+    from SimpleCV.Features.MotionField import _blockMean
+    data = np.random.rand(50, 64).astype(np.float32)
+    (window, n, cx, cy) = (7, 6, 9, 7)
+    means = _blockMean(data, cx, cy, window, n)
+    for x in range(cx):
+        for y in range(cy):
+            assert abs(means[y, x] - np.average(data[y*window:y*window+n, x*window:x*window+n])) < 1e-5
+    #an engine keeps the last frame and its buffers
+    engine = FlowEngine(method="LK", window=7)
+    assert engine.update(prev) is None
+    field = engine.update(current)
+    buffers = engine._buffers.values()[0]
+    again = engine.compute(current, prev)
+    assert engine._buffers.values()[0] is buffers
+    assert np.allclose(field.dx, again.dx)
+    assert len(field.toFeatureSet()) == len(field)
+
+def test_keypoint_index():
+    try:
+        import cv2
+    except:
+        return
+    template = Image("../sampleimages/KeypointTemplate2.png")
+    index = KeypointIndex([template, Image("../sampleimages/aerospace.jpg")], quality=300.00)
+    assert len(index) == 2
+    assert index.descriptors.shape[0] == len(index.owners) == len(index.points)
+    match0 = Image("../sampleimages/kptest0.png")
+    counts, homographies = index.query(match0, minDist=0.5)
+    assert counts[0] > counts[1]
+    assert homographies[0] is not None
+    fs = match0.findKeypointMatch(index, minDist=0.5, minMatch=int(counts[0]))
+    assert fs is not None and fs[0].template_index == 0
+    #minMatch is passed on to the index
+    assert match0.findKeypointMatch(index, minDist=0.5, minMatch=int(counts[0])+1) is None
+    fs.draw()
+    #a saved index is memory mapped when loaded and matches the same way
+    path = os.path.join(tempfile.mkdtemp(), "logos.index")
+    index.save(path)
+    loaded = KeypointIndex.load(path)
+    assert loaded.sizes == index.sizes
+    assert isinstance(loaded.descriptors, np.memmap)
+    assert np.all(loaded.query(match0, minDist=0.5)[0] == counts)
+    #templates with fewer than 4 matches never get a homography
+    counts, homographies = index.query(match0, minDist=0.5, minMatch=1)
+    assert not [h for h, c in zip(homographies, counts) if c < 4 and h is not None]
+    assert loaded.match(match0, minDist=0.5)[0]._template is None
+
+def test_keypoint_process_cache():
+    try:
+        import cv2
+    except:
+        return
+    from SimpleCV.ImageClass import _keypointCache
+    #off by default
+    img = Image("../sampleimages/KeypointTemplate2.png")
+    img._getRawKeypoints(300.00, "SURF")
+    assert len(_keypointCache) == 0
+    init_options_handler.set_keypoint_cache_size(64)
+    try:
+        img = Image("../sampleimages/KeypointTemplate2.png")
+        kp, d = img._getRawKeypoints(300.00, "SURF")
+        if kp is None:
+            return
+        orb = img._getRawKeypoints(300.00, "ORB")
+        #another image with the same pixels gets both flavors from the cache
+        same = Image("../sampleimages/KeypointTemplate2.png")
+        assert same._getRawKeypoints(300.00, "SURF")[1] is d
+        assert same._getRawKeypoints(300.00, "ORB")[0] is orb[0]
+        assert same._getRawKeypoints(300.00, "SURF", forceReset=True)[1] is not d
+        #changed pixels miss
+        other = img.invert()
+        assert other._getRawKeypoints(300.00, "SURF")[1] is not d
+        init_options_handler.set_keypoint_cache_size(1)
+        img._getRawKeypoints(300.00, "SURF", forceReset=True)
+        assert len(_keypointCache) == 1
+    finally:
+        init_options_handler.set_keypoint_cache_size(0)
+        _keypointCache.clear()
+
+def test_feature_cache_keys():
+    from SimpleCV.MachineLearning.ClassifierUtils import FeatureCache
+    cachedir = tempfile.mkdtemp()
+    img = Image(testimage)
+    hue = HueHistogramFeatureExtractor()
+    cache = FeatureCache(cachedir, [hue])
+    #images in memory are keyed by their pixels
+    assert cache.get(img) is None
+    cache.put(img, hue.extract(img))
+    assert FeatureCache(cachedir, [HueHistogramFeatureExtractor()]).get(img.copy()) == hue.extract(img)
+    assert FeatureCache(cachedir, [HueHistogramFeatureExtractor(mNBins=8)]).get(img) is None
+    #the key doesn't change once an extractor has been used
+    morph = MorphologyFeatureExtractor()
+    before = FeatureCache(cachedir, [morph]).config
+    morph.extract(img)
+    assert FeatureCache(cachedir, [morph]).config == before
+
+def test_feature_store_copies_are_read_only():
+    from SimpleCV.Features.CachedFeatureExtractor import _imageDigest
+    store = FeatureStore(tempfile.mkdtemp())
+    hue = CachedFeatureExtractor(HueHistogramFeatureExtractor(), store)
+    img = Image(testimage)
+    expected = hue.extract(img)
+    store.flush()
+    #a copy, as sent to a worker process, reads the tables but doesn't write them
+    worker = pickle.loads(pickle.dumps(hue, 2))
+    assert worker.mStore.readonly
+    assert np.allclose(worker.extract(img), expected)
+    other = img.invert()
+    worker.extract(other)
+    assert len(worker.mStore.pending) == 1
+    assert store.get(hue.mKey, hue.getNumFields(), _imageDigest(other)) is None
+    #a hit doesn't make the index be written again
+    table = store._table(hue.mKey, hue.getNumFields())
+    hue.extract(img)
+    assert not table.dirty
+
+def test_blob_rotate_lazy_geometry():
+    img = Image(testimage2)
+    cached = img.findBlobs()[-1]
+    lazy = img.findBlobs()[-1]
+    cached.mConvexHull
+    cached.mContourAppx
+    cached.rotate(90)
+    lazy.rotate(90)
+    #a hull built on demand is rotated once, like one that was already built
+    assert np.allclose(cached.mConvexHull, lazy.mConvexHull)
+    assert cached.mContourAppx == lazy.mContourAppx
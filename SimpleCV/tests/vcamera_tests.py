@@ -1,6 +1,6 @@
 #!/usr/bin/python
 
-import os, sys
+import os, sys, tempfile
 from SimpleCV import *
 from nose.tools import with_setup
 
@@ -73,3 +73,42 @@ def test_camera_iset_directory():
         pass
     else:
         assert False
+
+def test_camera_iset_prefetch():
+    iset = './standard/'
+    mycam = VirtualCamera(iset, "imageset", prefetch=4, workers=2)
+    names = [mycam.getImage().filename for i in range(5)]
+    assert names == [mycam.source[i].filename for i in range(5)]
+    mycam.rewind()
+    assert mycam.getImage().filename == names[0]
+    if(doFullVCamCoverageTest(mycam)):
+        pass
+    else:
+        assert False
+
+def test_camera_video_seekindex():
+    cachedir = tempfile.mkdtemp()
+    plain = VirtualCamera(testvideo, "video")
+    frames = [plain.getImage() for i in range(12)]
+    mycam = VirtualCamera(testvideo, "video", seekindex=True, cachedir=cachedir)
+    assert len(mycam.getVideoIndex()) > 12
+    img = mycam.getFrame(10)
+    assert img is not None
+    assert img.getNumpy().tostring() == frames[9].getNumpy().tostring()
+    mycam.skipFrames(5)
+    assert mycam.getFrameNumber() == 4
+    img = mycam.getImage()
+    assert img.getNumpy().tostring() == frames[4].getNumpy().tostring()
+    decoded = list(mycam.decodeSegments(3))
+    assert [number for number, img in decoded] == range(1, len(mycam.getVideoIndex()) + 1)
+    assert decoded[11][1].getNumpy().tostring() == frames[11].getNumpy().tostring()
+    #a shallow queue still lets later segments run ahead and keeps the order
+    decoded = list(mycam.decodeSegments(4, depth=1))
+    assert [number for number, img in decoded] == range(1, len(mycam.getVideoIndex()) + 1)
+    #a seek far from the start asks for a frame near the one wanted and remembers where it landed
+    index = mycam.getVideoIndex()
+    last = len(index) - 1
+    if last > 16:
+        img = mycam.getFrame(last + 1)
+        assert img.getNumpy().tostring() == decoded[last][1].getNumpy().tostring()
+        assert max(index.anchors) > 0